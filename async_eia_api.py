@@ -0,0 +1,399 @@
+# async_eia_api.py
+
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+import metrics
+from eia_api import EIAAPI, PAGE_SIZE, normalize_data
+from http_session import RETRY_STATUSES, backoff_delay, parse_retry_after
+from metadata_cache import MetadataCache
+from periods import period_range
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for the asyncio client
+    aiohttp = None
+
+class AsyncEIAAPI(EIAAPI):
+    def __init__(self, api_key, cache_dir=None, cache_ttls=None, memo_size=256, max_concurrency=8, timeout=60,
+                 max_retries=3, backoff_factor=1.0, max_backoff=60):
+        """
+        Initializes an asyncio EIA client with the same methods as `EIAAPI`, as coroutines.
+
+        Requests share one aiohttp session and at most `max_concurrency` are in flight at
+        once, so callers can `asyncio.gather` many metadata or page requests safely. The
+        in-memory memo and persistent metadata cache are the same as in `EIAAPI`.
+
+        Args:
+            api_key (str): Your EIA API key.
+            cache_dir (str, optional): Directory for the persistent metadata cache. Defaults to None.
+            cache_ttls (dict, optional): Per-endpoint TTLs in seconds for the metadata cache.
+            memo_size (int, optional): The maximum number of metadata responses kept in memory. Defaults to 256.
+            max_concurrency (int, optional): The maximum number of requests in flight. Defaults to 8.
+            timeout (float, optional): Total timeout in seconds for a single request. Defaults to 60.
+            max_retries (int, optional): Number of retries for 429/5xx answers and connection errors. Defaults to 3.
+            backoff_factor (float, optional): Base delay in seconds for exponential backoff. Defaults to 1.0.
+            max_backoff (float, optional): Upper bound in seconds for a single delay. Defaults to 60.
+
+        Raises:
+            ImportError: If aiohttp is not installed.
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncEIAAPI requires aiohttp. Install it with 'pip install aiohttp'.")
+        super().__init__(api_key, cache_dir=cache_dir, cache_ttls=cache_ttls, memo_size=memo_size)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self._session = None
+        self._semaphore = None
+        self._in_flight = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes the underlying aiohttp session.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+
+    def _ensure_session(self):
+        # The session and semaphore are bound to the running event loop, so they are created lazily
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, auto_decompress=True,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    @staticmethod
+    def _query(params):
+        # aiohttp takes repeated keys as a list of pairs rather than list values
+        query = []
+        for key, value in params.items():
+            for item in (value if isinstance(value, list) else [value]):
+                query.append((key, str(item)))
+        return query
+
+    async def _get(self, url, params, headers=None):
+        """
+        Sends a GET request, retrying rate limits and transient failures with backoff.
+
+        Returns:
+            tuple: (status, headers, decoded JSON or None).
+
+        Raises:
+            aiohttp.ClientError: If the last attempt fails.
+        """
+        session = self._ensure_session()
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    async with session.get(url, params=self._query(params), headers=headers) as response:
+                        if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                            metrics.count("http_retries_total", host=urlsplit(url).netloc, reason=str(response.status))
+                            delay = parse_retry_after(response.headers)
+                        else:
+                            response.raise_for_status()
+                            data = None
+                            if response.status != 304:
+                                body = await response.read()
+                                with metrics.timer("eia_json_parse_seconds"):
+                                    data = json.loads(body)
+                                metrics.count("http_response_bytes_total", len(body), host=urlsplit(url).netloc)
+                            metrics.observe("http_request_seconds", time.perf_counter() - start,
+                                            host=urlsplit(url).netloc, method="GET", status=response.status)
+                            return response.status, dict(response.headers), data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    metrics.count("http_errors_total", host=urlsplit(url).netloc, error=type(e).__name__)
+                    raise
+                metrics.count("http_retries_total", host=urlsplit(url).netloc, reason=type(e).__name__)
+                delay = None
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_factor, self.max_backoff)
+            await asyncio.sleep(min(delay, self.max_backoff))
+
+    async def _get_metadata(self, endpoint, url, params, *key_parts):
+        """
+        Fetches a metadata response through the memo and persistent cache, sharing in-flight calls.
+        """
+        key = MetadataCache.make_key(endpoint, *key_parts)
+        data = self.memo.get(key)
+        if data is not None:
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="memo_hit")
+            return data
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_metadata(endpoint, url, params, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        data = await task
+        # Empty answers are not memoized, so a transient failure is retried on the next call
+        if data:
+            self.memo.put(key, data)
+        return data
+
+    async def _load_metadata(self, endpoint, url, params, key):
+        if self.cache is None:
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="fetched")
+            return (await self._get(url, params))[2]
+
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="disk_hit")
+            return entry["value"]
+
+        status, headers, data = await self._get(url, params, headers=self.cache.conditional_headers(entry))
+        if status == 304 and entry is not None:
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="revalidated")
+            self.cache.touch(entry)
+            return entry["value"]
+        metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="fetched")
+        self.cache.set(key, endpoint, data, etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"))
+        return data
+
+    async def fetch_routes(self):
+        """
+        Fetches the list of available routes from the EIA API.
+
+        Returns:
+            list: A list of routes where each route is a dictionary with route details.
+        """
+        try:
+            data = await self._get_metadata("routes", self.base_url, {"api_key": self.api_key})
+            return data["response"]["routes"]
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError):
+            return []
+
+    async def fetch_route_details(self, route_id):
+        """
+        Fetches the details of a specific route.
+
+        Args:
+            route_id (str): The ID of the route to fetch details for.
+
+        Returns:
+            dict or None: The route details if successful, None otherwise.
+        """
+        url = f"{self.base_url}{route_id}/"
+        try:
+            data = await self._get_metadata("route_details", url, {"api_key": self.api_key}, route_id)
+            return data["response"]
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError):
+            return None
+
+    async def fetch_facet_options(self, route_id, facet_id):
+        """
+        Fetches the available options for a specific facet of a route.
+
+        Args:
+            route_id (str): The ID of the route.
+            facet_id (str): The ID of the facet.
+
+        Returns:
+            list: A list of tuples containing (option_name, option_id).
+        """
+        url = f"{self.base_url}{route_id}/facet/{facet_id}"
+        try:
+            data = await self._get_metadata("facet_options", url, {"api_key": self.api_key}, route_id, facet_id)
+            return self._parse_facet_options(data)
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError):
+            return []
+
+    async def fetch_data_fields(self, route_id):
+        """
+        Fetches the available data fields for a specific route.
+
+        Args:
+            route_id (str): The ID of the route.
+
+        Returns:
+            list: A list of tuples containing (field_alias, field_id).
+        """
+        return self._parse_data_fields(await self.fetch_route_details(route_id))
+
+    async def _fetch_page(self, url, params, offset, length):
+        page_params = dict(params)
+        page_params["offset"] = offset
+        page_params["length"] = length
+        records, total = self._parse_page((await self._get(url, page_params))[2])
+        metrics.count("eia_rows_parsed_total", len(records))
+        return records, total
+
+    async def iter_data(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None,
+                        max_rows=None, page_size=PAGE_SIZE):
+        """
+        Iterates over the data for a query one page at a time.
+
+        Yields:
+            pandas.DataFrame: The rows of each page, in offset order.
+
+        Raises:
+            aiohttp.ClientError: If a page request fails.
+        """
+        url = f"{self.base_url}{route_id}/data/"
+        params = self._build_data_params(frequency, facets, data_fields, start_date, end_date)
+        if params is None:
+            return
+
+        page_size = min(page_size, PAGE_SIZE)
+        offset = 0
+        total = None
+        while total is None or offset < total:
+            length = page_size if max_rows is None else min(page_size, max_rows - offset)
+            if length <= 0:
+                break
+
+            records, page_total = await self._fetch_page(url, params, offset, length)
+            if total is None:
+                total = page_total if max_rows is None else min(page_total, max_rows)
+            if not records:
+                break
+
+            yield pd.DataFrame(records)
+            offset += len(records)
+
+    async def fetch_period_bounds(self, route_id, frequency, facets, data_fields=None):
+        """
+        Fetches the earliest and latest period available for a query with two sorted single-row requests.
+
+        Returns:
+            tuple or None: (first_period, last_period), or None if nothing matched or a request failed.
+        """
+        # Shares the memo entries of the synchronous client (and warm-up prefetches)
+        key = self._period_bounds_key(route_id, frequency, facets, data_fields)
+        bounds = self.memo.get(key)
+        if bounds is not None:
+            return bounds
+
+        url = f"{self.base_url}{route_id}/data/"
+        params = self._build_data_params(frequency, facets, data_fields or [])
+        pages = []
+        for direction in ("asc", "desc"):
+            sorted_params = dict(params)
+            sorted_params["sort[0][column]"] = "period"
+            sorted_params["sort[0][direction]"] = direction
+            pages.append(self._fetch_page(url, sorted_params, 0, 1))
+        try:
+            (first, _), (last, _) = await asyncio.gather(*pages)
+            if not first or not last:
+                return None
+            bounds = first[0]["period"], last[0]["period"]
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError):
+            return None
+        self.memo.put(key, bounds)
+        return bounds
+
+    async def fetch_available_periods(self, route_id, frequency, facets, data_fields=None):
+        """
+        Lists the periods available for a query without downloading its rows.
+
+        Returns:
+            list: The period strings in ascending order, empty if none are available.
+        """
+        bounds = await self.fetch_period_bounds(route_id, frequency, facets, data_fields)
+        if bounds is None:
+            return []
+        return period_range(bounds[0], bounds[1], frequency)
+
+    async def fetch_data(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None,
+                         max_rows=None, paginate=False, page_size=PAGE_SIZE, normalize=False, float_dtype="float64"):
+        """
+        Fetches data from the EIA API based on the specified parameters.
+
+        When paginating, the first page reports the total row count and the remaining
+        pages are requested concurrently, then reassembled in offset order.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs to include in the response.
+            start_date (str): The start date in 'YYYY-MM' format.
+            end_date (str): The end date in 'YYYY-MM' format.
+            max_rows (int, optional): The maximum number of rows to return. Defaults to None.
+            paginate (bool, optional): Fetch every page instead of only the first. Defaults to False.
+            page_size (int, optional): The number of rows requested per page. Defaults to PAGE_SIZE.
+            normalize (bool, optional): Convert columns with `normalize_data`. Defaults to False.
+            float_dtype (str, optional): The dtype of numeric data fields when normalizing.
+
+        Returns:
+            pandas.DataFrame: A DataFrame containing the fetched data, empty on failure.
+        """
+        url = f"{self.base_url}{route_id}/data/"
+        params = self._build_data_params(frequency, facets, data_fields, start_date, end_date)
+        if params is None:
+            return pd.DataFrame()
+
+        page_size = min(page_size, PAGE_SIZE)
+        first_length = page_size if max_rows is None else min(page_size, max_rows)
+        try:
+            records, total = await self._fetch_page(url, params, 0, first_length)
+            pages = [records]
+            if paginate and records:
+                if max_rows is not None:
+                    total = min(total, max_rows)
+                offsets = range(len(records), total, page_size)
+                tasks = [asyncio.ensure_future(self._fetch_page(url, params, offset, min(page_size, total - offset)))
+                         for offset in offsets]
+                try:
+                    pages += [page for page, _ in await asyncio.gather(*tasks)]
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return pd.DataFrame()
+
+        frames = [pd.DataFrame(page) for page in pages if page]
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, ignore_index=True)
+
+        if self.warehouse is not None:
+            self.warehouse.write(data, route_id, frequency, data_fields)
+        if normalize:
+            route_details = await self.fetch_route_details(route_id) or {"data": dict.fromkeys(data_fields)}
+            data = normalize_data(data, route_details, frequency, float_dtype=float_dtype)
+        return data
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def run_in_background_loop(coro, timeout=None):
+    """
+    Runs a coroutine on a shared event loop in a daemon thread and waits for its result.
+
+    This lets synchronous code, including Jupyter widget callbacks that already run inside
+    the kernel's own event loop, drive `AsyncEIAAPI` without nesting event loops. The
+    loop is reused so the client's aiohttp session stays bound to a single loop.
+
+    Args:
+        coro (coroutine): The coroutine to run.
+        timeout (float, optional): Seconds to wait for the result. Defaults to None (no limit).
+
+    Returns:
+        The coroutine's result.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="eia-async-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop).result(timeout)
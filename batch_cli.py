@@ -0,0 +1,226 @@
+# batch_cli.py
+"""
+Headless batch fetcher for EIA data.
+
+Runs every facet combination described in a JSON job spec with bounded concurrency and
+writes one CSV per combination. Finished outputs are skipped on the next run, so an
+interrupted batch can simply be started again. This module deliberately avoids
+ipywidgets/IPython so it starts quickly in cron jobs and containers.
+
+Example spec:
+
+    {
+        "output_dir": "batch_output",
+        "max_workers": 4,
+        "jobs": [
+            {
+                "route": "retail-sales",
+                "frequencies": ["monthly"],
+                "facets": {"stateid": "*", "sectorid": ["RES", "COM"]},
+                "data": ["price", "sales"],
+                "start": "2020-01",
+                "end": "2024-12"
+            }
+        ]
+    }
+
+A facet value of "*" expands to every option the API lists for that facet.
+
+Usage:
+
+    python batch_cli.py spec.json [--output-dir DIR] [--max-workers N] [--dry-run]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from eia_api import EIAAPI
+
+def expand_tasks(api, spec, failed=None):
+    """
+    Expands a job spec into one task per (route, frequency, facet combination).
+
+    Args:
+        api (EIAAPI): The client used to list facet options for "*" values.
+        spec (dict): The parsed job spec.
+        failed (list, optional): Collects "route/facet/id" entries whose "*" expansion came back
+            empty; their jobs are skipped. Defaults to None (raise instead).
+
+    Returns:
+        list: Task dictionaries with 'route', 'frequency', 'facets', 'data', 'start' and 'end'.
+
+    Raises:
+        ValueError: If a "*" value expands to no options and `failed` is None.
+    """
+    tasks = []
+    for job in spec.get("jobs", []):
+        route_id = job["route"]
+        facet_ids = list(job.get("facets", {}))
+        facet_values = []
+        for facet_id in facet_ids:
+            values = job["facets"][facet_id]
+            if values == "*":
+                values = [option_id for _, option_id in api.fetch_facet_options(route_id, facet_id)]
+                # fetch_facet_options returns [] on errors, which must not pass for "nothing to fetch"
+                if not values:
+                    if failed is None:
+                        raise ValueError(f"No options found for facet '{facet_id}' of route '{route_id}'")
+                    failed.append(f"{route_id}/facet/{facet_id}")
+            elif not isinstance(values, list):
+                values = [values]
+            facet_values.append(values)
+        if not all(facet_values):
+            continue
+
+        for frequency in job.get("frequencies", ["monthly"]):
+            for combination in itertools.product(*facet_values):
+                tasks.append({
+                    "route": route_id,
+                    "frequency": frequency,
+                    "facets": dict(zip(facet_ids, combination)),
+                    "data": job.get("data", []),
+                    "start": job.get("start"),
+                    "end": job.get("end"),
+                })
+    return tasks
+
+def task_output_path(output_dir, task):
+    """
+    Returns the CSV path a task writes to.
+
+    Args:
+        output_dir (str): The root output directory.
+        task (dict): A task from `expand_tasks`.
+
+    Returns:
+        str: The output path, unique per route, frequency and facet combination.
+    """
+    facet_part = "_".join(f"{facet_id}-{value}" for facet_id, value in sorted(task["facets"].items())) or "all"
+    facet_part = re.sub(r"[^A-Za-z0-9_.-]+", "-", facet_part)
+    route_part = re.sub(r"[^A-Za-z0-9_.-]+", "-", task["route"].strip("/"))
+    return os.path.join(output_dir, route_part, task["frequency"], f"{facet_part}.csv")
+
+def run_task(api, task, path):
+    """
+    Fetches all pages of a task and streams them to a CSV file.
+
+    Pages are appended to a temporary file that is renamed into place only once the
+    whole task succeeded, so an existing output file always means a completed task.
+    A task the API reports no rows for leaves an empty file, so it counts as done too.
+
+    Args:
+        api (EIAAPI): The client used to fetch data.
+        task (dict): A task from `expand_tasks`.
+        path (str): The output path.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        requests.RequestException: If a page request fails.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    rows = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in api.iter_data(task["route"], task["frequency"], task["facets"], task["data"],
+                                       start_date=task["start"], end_date=task["end"]):
+                chunk.to_csv(f, header=(rows == 0), index=False)
+                rows += len(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+def run_batch(api, spec, output_dir, max_workers=4, dry_run=False):
+    """
+    Runs every task of a job spec that does not have an output yet.
+
+    Args:
+        api (EIAAPI): The client used to fetch data.
+        spec (dict): The parsed job spec.
+        output_dir (str): The root output directory.
+        max_workers (int, optional): The maximum number of tasks fetched concurrently. Defaults to 4.
+        dry_run (bool, optional): Only list pending tasks. Defaults to False.
+
+    Returns:
+        dict: Counts of 'done', 'skipped' and 'failed' tasks. A job whose "*" facet could not
+        be expanded counts as one failed task.
+    """
+    summary = {"done": 0, "skipped": 0, "failed": 0}
+    pending = []
+    failed = []
+    tasks = expand_tasks(api, spec, failed)
+    for entry in failed:
+        summary["failed"] += 1
+        print(f"failed: {entry}: no facet options to expand '*'", file=sys.stderr)
+    for task in tasks:
+        path = task_output_path(output_dir, task)
+        if os.path.exists(path):
+            summary["skipped"] += 1
+        else:
+            pending.append((task, path))
+
+    if dry_run:
+        for task, path in pending:
+            print(f"pending: {path}")
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_task, api, task, path): path for task, path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                # Request errors and any other failure of one task (e.g. an unwritable path) must not stop the rest
+                summary["failed"] += 1
+                print(f"failed: {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                summary["done"] += 1
+                print(f"wrote {rows} rows: {path}")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch EIA data for every facet combination in a job spec.")
+    parser.add_argument("spec", help="Path to the JSON job spec.")
+    parser.add_argument("--output-dir", help="Output directory (overrides the spec).")
+    parser.add_argument("--max-workers", type=int, help="Maximum concurrent fetches (overrides the spec).")
+    parser.add_argument("--cache-dir", default=".eia_cache", help="Metadata cache directory.")
+    parser.add_argument("--env-file", default="api.env", help="File to load EIA_API_KEY from.")
+    parser.add_argument("--dry-run", action="store_true", help="List pending tasks without fetching.")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(args.env_file)
+    except ImportError:
+        pass
+    api_key = os.getenv("EIA_API_KEY")
+    if not api_key:
+        print("EIA_API_KEY is not set.", file=sys.stderr)
+        return 2
+
+    with open(args.spec, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+
+    api = EIAAPI(api_key=api_key, cache_dir=args.cache_dir)
+    summary = run_batch(
+        api,
+        spec,
+        output_dir=args.output_dir or spec.get("output_dir", "batch_output"),
+        max_workers=args.max_workers or spec.get("max_workers", 4),
+        dry_run=args.dry_run,
+    )
+    print(f"done: {summary['done']}, skipped: {summary['skipped']}, failed: {summary['failed']}")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# benchmarks.py
+"""
+End-to-end benchmarks of the EIA and analysis paths against the local mock server.
+
+Each benchmark runs a scenario several times and reports throughput, p50/p99 latency
+and peak traced memory (the mock server runs in the same process and is included).
+Results can be saved as JSON and compared against a saved
+baseline; the command exits with status 1 if any p50 latency regressed by more than
+the tolerance, so it can gate a release.
+
+Usage:
+
+    python benchmarks.py [--iterations N] [--only NAME ...] [--eia-latency S]
+                         [--save results.json] [--baseline results.json] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from chat_gpt_api import ChatGPTAPI
+from eia_api import EIAAPI
+from mock_server import MockServer, ROUTES
+from prompt_builder import build_data_section
+from prompt_templates import LOD_ANALYSIS_TEMPLATE
+
+ROUTE_ID = "retail-sales"
+
+def percentile(samples, q):
+    """
+    Returns the q-th percentile (0-1) of a list of numbers by nearest rank.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def _eia_client(server):
+    api = EIAAPI(api_key="benchmark")
+    api.base_url = server.eia_url
+    return api
+
+def bench_metadata(server):
+    """
+    Cold-loads the route catalog, one route's details and all of its facet options.
+
+    Returns:
+        int: The number of metadata items loaded.
+    """
+    api = _eia_client(server)
+    routes = api.fetch_routes()
+    fields = api.fetch_data_fields(ROUTE_ID)
+    options = [api.fetch_facet_options(ROUTE_ID, facet_id) for facet_id in ROUTES[ROUTE_ID]["facets"]]
+    return len(routes) + len(fields) + sum(len(values) for values in options)
+
+def bench_paginated_pull(server):
+    """
+    Pulls every row of a route with concurrent offset pagination.
+
+    Returns:
+        int: The number of rows fetched.
+    """
+    api = _eia_client(server)
+    data = api.fetch_data(ROUTE_ID, "monthly", {}, ["price", "sales"], paginate=True, max_workers=4)
+    return len(data)
+
+def bench_available_periods(server):
+    """
+    Lists the available periods of one series.
+
+    Returns:
+        int: The number of periods.
+    """
+    api = _eia_client(server)
+    return len(api.fetch_available_periods(ROUTE_ID, "monthly", {"stateid": "ST00"}))
+
+def bench_analysis(server):
+    """
+    Fetches one state's data, builds the prompt and runs a (non-cached) analysis.
+
+    Returns:
+        int: The number of characters generated.
+    """
+    api = _eia_client(server)
+    chat = ChatGPTAPI(api_key="benchmark")
+    chat.base_url = server.openai_url
+    data = api.fetch_data(ROUTE_ID, "monthly", {"stateid": "ST00"}, ["price", "sales"], paginate=True)
+    result = chat.analyze_data(build_data_section(data, data_fields=["price", "sales"]), use_cache=False, template=LOD_ANALYSIS_TEMPLATE)
+    return len(result.get("generated_text", ""))
+
+def bench_analysis_first_token(server):
+    """
+    Measures the time until the first streamed analysis chunk arrives.
+
+    Returns:
+        int: 1 once the first chunk has arrived.
+    """
+    chat = ChatGPTAPI(api_key="benchmark")
+    chat.base_url = server.openai_url
+    stream = chat.stream_data("Summarize the benchmark dataset.")
+    next(stream)
+    stream.close()
+    return 1
+
+BENCHMARKS = {
+    "metadata": bench_metadata,
+    "paginated_pull": bench_paginated_pull,
+    "available_periods": bench_available_periods,
+    "analysis": bench_analysis,
+    "analysis_first_token": bench_analysis_first_token,
+}
+
+def run_benchmark(name, server, iterations=5):
+    """
+    Runs one benchmark several times after a warm-up run, then once more with memory tracing.
+
+    Args:
+        name (str): A key of `BENCHMARKS`.
+        server (MockServer): The running mock server.
+        iterations (int, optional): The number of measured runs. Defaults to 5.
+
+    Returns:
+        dict: 'iterations', 'items' (per run), 'throughput' (items per second), 'p50' and
+        'p99' (seconds), 'requests' (HTTP requests per run) and 'peak_memory_mb'.
+    """
+    function = BENCHMARKS[name]
+    function(server)  # Warm up connections and lazily built server data
+
+    latencies = []
+    items = 0
+    requests_before = server.request_count
+    for _ in range(iterations):
+        start = time.perf_counter()
+        items = function(server)
+        latencies.append(time.perf_counter() - start)
+    requests = (server.request_count - requests_before) / iterations
+
+    # Memory is traced in a separate run, since tracing slows allocation-heavy code several times over
+    tracemalloc.start()
+    try:
+        function(server)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "items": items,
+        "throughput": items * iterations / sum(latencies) if sum(latencies) else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "requests": requests,
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Lists the benchmarks whose p50 latency regressed against a baseline.
+
+    Args:
+        results (dict): The output of `run_benchmark` per benchmark name.
+        baseline (dict): Earlier results in the same format.
+        tolerance (float, optional): The allowed relative slowdown. Defaults to 0.2 (20%).
+
+    Returns:
+        list: (name, baseline_p50, p50) tuples of regressed benchmarks.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["p50"] > previous["p50"] * (1 + tolerance):
+            regressions.append((name, previous["p50"], result["p50"]))
+    return regressions
+
+def format_results(results):
+    lines = [f"{'benchmark':<22} {'items':>8} {'items/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'requests':>9} {'peak MB':>8}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<22} {result['items']:>8} {result['throughput']:>10.1f} {result['p50'] * 1000:>9.1f} "
+            f"{result['p99'] * 1000:>9.1f} {result['requests']:>9.1f} {result['peak_memory_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EIA and analysis paths against a local mock server.")
+    parser.add_argument("--iterations", type=int, default=5, help="Measured runs per benchmark.")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks.")
+    parser.add_argument("--facet-size", type=int, default=10, help="Options per facet served by the mock.")
+    parser.add_argument("--periods", type=int, default=120, help="Periods per series served by the mock.")
+    parser.add_argument("--eia-latency", type=float, default=0.02, help="Seconds added to every EIA response.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds before the first completion token.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against results saved earlier with --save.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p50 slowdown (default 0.2).")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    results = {}
+    with MockServer(facet_size=args.facet_size, periods=args.periods, eia_latency=args.eia_latency,
+                    llm_latency=args.llm_latency) as server:
+        for name in names:
+            results[name] = run_benchmark(name, server, iterations=args.iterations)
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, previous, current in regressions:
+            print(f"REGRESSION {name}: p50 {previous * 1000:.1f} ms -> {current * 1000:.1f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,453 @@
+# catalog_index.py
+"""
+Offline, searchable index of the whole EIA electricity route tree.
+
+`crawl_catalog` walks every route once, including nested routes such as
+`rto/region-data` that `EIAAPI.fetch_routes` does not list, and records their
+frequencies, facets, facet values and data fields. `CatalogIndex` keeps the result in
+compact arrays and answers substring and word-prefix searches from memory in well
+under a millisecond, so finding out what exists needs no exploratory API calls:
+
+    index = crawl_catalog(EIAAPI(api_key))
+    index.save("eia_catalog.json.gz")
+
+    index = CatalogIndex.load("eia_catalog.json.gz")
+    index.search("texas res")  # Anything mentioning both words
+    index.search("ca", kind="value", route_id="retail-sales", facet_id="stateid")
+
+Or from the command line:
+
+    python catalog_index.py build [--out eia_catalog.json.gz] [--skip-values]
+    python catalog_index.py search QUERY [--kind value] [--route ID] [--facet ID] [--limit N]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+DEFAULT_CATALOG_PATH = "eia_catalog.json.gz"
+CATALOG_VERSION = 1
+
+# Kinds of index entries, stored as their position in this tuple
+KINDS = ("route", "field", "facet", "value")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _words(text):
+    return _WORD.findall(str(text).lower())
+
+def _grams(words):
+    """
+    Returns the n-grams an entry is indexed under: every trigram within a word, plus
+    "^a" and "^ab" word-start markers so one- and two-character terms can match word prefixes.
+    """
+    grams = set()
+    for word in words:
+        grams.add("^" + word[:1])
+        if len(word) > 1:
+            grams.add("^" + word[:2])
+        for index in range(len(word) - 2):
+            grams.add(word[index:index + 3])
+    return grams
+
+class CatalogIndex:
+    def __init__(self, routes, built_at=None, failed=()):
+        """
+        Initializes an index over crawled route metadata.
+
+        Every route, data field, facet and facet value becomes one entry whose ID and name
+        are searchable. Entries of one route, and the values of one facet, are stored
+        contiguously, so searches scoped to a route or facet only look at that range.
+
+        Args:
+            routes (dict): For each route ID (nested IDs contain "/"), a dict with 'name',
+                'description', 'routes' (child route IDs), 'frequencies', 'default_frequency',
+                'facets' ([{'id', 'description'}]), 'data' ([[alias, field_id]]) and
+                'facet_values' ({facet_id: [[value_id, name]]}).
+            built_at (float, optional): The crawl time as a Unix timestamp. Defaults to None.
+            failed (iterable, optional): Route IDs whose details could not be fetched, and
+                "route/facet/facet_id" paths of facets without values. Defaults to ().
+        """
+        self.routes = routes
+        self.built_at = built_at
+        self.failed = list(failed)
+        self._build()
+
+    def _build(self):
+        start = time.perf_counter()
+        self._kinds = array("B")
+        self._scopes = array("I")  # Position in self._scope_keys of each entry's (route ID, facet ID)
+        self._scope_keys = []
+        self._ids = []
+        self._names = []
+        self._texts = []  # Normalized "id name" text that searches are verified against
+        self._ranges = {}  # (route ID, None) and (route ID, facet ID) -> (first entry, end entry)
+        postings = {}
+
+        def add(kind, scope, entry_id, name):
+            position = len(self._ids)
+            words = _words(f"{entry_id} {name}")
+            self._kinds.append(KINDS.index(kind))
+            self._scopes.append(scope)
+            self._ids.append(entry_id)
+            self._names.append(name)
+            self._texts.append(" ".join(words))
+            for gram in _grams(words):
+                postings.setdefault(gram, []).append(position)
+
+        for route_id in sorted(self.routes):
+            route = self.routes[route_id]
+            route_start = len(self._ids)
+            self._scope_keys.append((route_id, None))
+            route_scope = len(self._scope_keys) - 1
+            add("route", route_scope, route_id, route.get("name") or route.get("description") or "")
+            for alias, field_id in route.get("data", []):
+                add("field", route_scope, field_id, alias)
+            for facet in route.get("facets", []):
+                add("facet", route_scope, facet["id"], facet.get("description", ""))
+            for facet in route.get("facets", []):
+                values_start = len(self._ids)
+                self._scope_keys.append((route_id, facet["id"]))
+                facet_scope = len(self._scope_keys) - 1
+                for value_id, name in route.get("facet_values", {}).get(facet["id"], []):
+                    add("value", facet_scope, value_id, name)
+                self._ranges[(route_id, facet["id"])] = (values_start, len(self._ids))
+            self._ranges[(route_id, None)] = (route_start, len(self._ids))
+
+        # Positions are appended in increasing order, so every posting list is already sorted
+        self._postings = {gram: array("I", positions) for gram, positions in postings.items()}
+        self.build_seconds = time.perf_counter() - start
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _entry(self, position):
+        route_id, facet_id = self._scope_keys[self._scopes[position]]
+        return {"kind": KINDS[self._kinds[position]], "route_id": route_id, "facet_id": facet_id,
+                "id": self._ids[position], "name": self._names[position]}
+
+    def _candidates(self, terms, start, end):
+        # The entries in [start, end) of the shortest posting list among the query's terms
+        shortest = None
+        for term in terms:
+            if len(term) < 3:
+                grams = ["^" + term]
+            else:
+                grams = [term[index:index + 3] for index in range(len(term) - 2)]
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return None
+                if shortest is None or len(posting) < len(shortest):
+                    shortest = posting
+        low = bisect_left(shortest, start)
+        high = bisect_left(shortest, end, low)
+        return (shortest[index] for index in range(low, high))
+
+    @staticmethod
+    def _matches(text, terms):
+        for term in terms:
+            if len(term) < 3:
+                # Short terms only match at the start of a word
+                if not (text.startswith(term) or " " + term in text):
+                    return False
+            elif term not in text:
+                return False
+        return True
+
+    def search(self, query, kind=None, route_id=None, facet_id=None, limit=20):
+        """
+        Finds entries whose ID or name contains every word of the query.
+
+        Words of three or more characters match anywhere inside a word; shorter words
+        match word prefixes. Matching is case-insensitive and ignores punctuation. Among
+        the first `limit` matches, entries whose text starts with the query's first word
+        are listed first; otherwise entries keep their index order (by route, then facet).
+
+        Args:
+            query (str): The search text. An empty query matches every entry in scope.
+            kind (str, optional): Only return entries of this kind ('route', 'field', 'facet'
+                or 'value'). Defaults to None (all kinds).
+            route_id (str, optional): Only search the entries of this route. Defaults to None.
+            facet_id (str, optional): Only search the values of this facet (requires `route_id`).
+                Defaults to None.
+            limit (int, optional): The maximum number of results. Defaults to 20.
+
+        Returns:
+            list: Dicts with 'kind', 'route_id', 'facet_id' (for values), 'id' and 'name'.
+        """
+        if route_id is None:
+            start, end = 0, len(self._ids)
+        else:
+            scope = self._ranges.get((route_id, facet_id))
+            if scope is None:
+                return []
+            start, end = scope
+        kind_code = None if kind is None else KINDS.index(kind)
+
+        terms = _words(query)
+        if terms:
+            candidates = self._candidates(terms, start, end)
+            if candidates is None:
+                return []
+        else:
+            candidates = range(start, end)
+
+        leading, others = [], []
+        for position in candidates:
+            if kind_code is not None and self._kinds[position] != kind_code:
+                continue
+            text = self._texts[position]
+            if terms and not self._matches(text, terms):
+                continue
+            (leading if not terms or text.startswith(terms[0]) else others).append(position)
+            if len(leading) + len(others) >= limit:
+                break
+        return [self._entry(position) for position in leading + others]
+
+    def route(self, route_id):
+        """
+        Returns the crawled metadata of a route, or None if it is not in the index.
+        """
+        return self.routes.get(route_id)
+
+    def route_ids(self, leaves_only=True):
+        """
+        Lists the indexed route IDs.
+
+        Args:
+            leaves_only (bool, optional): Skip routes that only group child routes. Defaults to True.
+
+        Returns:
+            list: Sorted route IDs.
+        """
+        return sorted(route_id for route_id, route in self.routes.items()
+                      if not (leaves_only and route.get("routes")))
+
+    def facet_options(self, route_id, facet_id):
+        """
+        Returns a facet's values in the format of `EIAAPI.fetch_facet_options`.
+
+        Returns:
+            list: (option_name, option_id) tuples; empty if the facet is not in the index.
+        """
+        values = self.routes.get(route_id, {}).get("facet_values", {}).get(facet_id, [])
+        return [(f"{name} ({value_id})", value_id) for value_id, name in values]
+
+    def data_fields(self, route_id):
+        """
+        Returns a route's data fields in the format of `EIAAPI.fetch_data_fields`.
+
+        Returns:
+            list: (field_alias, field_id) tuples.
+        """
+        return [(alias, field_id) for alias, field_id in self.routes.get(route_id, {}).get("data", [])]
+
+    def stats(self):
+        """
+        Returns the size of the index.
+
+        Returns:
+            dict: Entry counts per kind, the number of 'routes', 'grams' and 'postings',
+            and 'build_seconds'.
+        """
+        stats = {kind: 0 for kind in KINDS}
+        for code in self._kinds:
+            stats[KINDS[code]] += 1
+        stats["routes"] = len(self.routes)
+        stats["grams"] = len(self._postings)
+        stats["postings"] = sum(len(posting) for posting in self._postings.values())
+        stats["build_seconds"] = self.build_seconds
+        return stats
+
+    def save(self, path=DEFAULT_CATALOG_PATH):
+        """
+        Writes the crawled metadata to a gzipped JSON file; the search index is rebuilt on load.
+
+        Args:
+            path (str, optional): The file to write. Defaults to DEFAULT_CATALOG_PATH.
+        """
+        payload = json.dumps({"version": CATALOG_VERSION, "built_at": self.built_at, "failed": self.failed,
+                              "routes": self.routes}, separators=(",", ":"))
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(payload.encode("utf-8")))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path=DEFAULT_CATALOG_PATH):
+        """
+        Loads an index saved with `save`.
+
+        Args:
+            path (str, optional): The file to read. Defaults to DEFAULT_CATALOG_PATH.
+
+        Returns:
+            CatalogIndex or None: The index, or None if the file is missing, unreadable or
+            from another catalog version.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(gzip.decompress(f.read()).decode("utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != CATALOG_VERSION:
+            return None
+        return cls(data.get("routes", {}), built_at=data.get("built_at"), failed=data.get("failed", ()))
+
+def _route_record(details):
+    return {
+        "name": details.get("name", ""),
+        "description": details.get("description", ""),
+        "routes": [],
+        "frequencies": [freq["id"] for freq in details.get("frequency", [])],
+        "default_frequency": details.get("defaultFrequency"),
+        "facets": [{"id": facet["id"], "description": facet.get("description", "")}
+                   for facet in details.get("facets", [])],
+        "data": [[field.get("alias", field_id), field_id] for field_id, field in details.get("data", {}).items()],
+        "facet_values": {},
+    }
+
+def crawl_catalog(api, route_ids=None, include_facet_values=True, max_workers=8):
+    """
+    Walks the route tree below the client's base URL and indexes everything it finds.
+
+    Route details are fetched breadth-first with up to `max_workers` requests in flight;
+    a route that lists child routes is a group whose children are crawled as
+    "parent/child". Facet values are fetched as soon as their route's details arrive.
+    Requests go through the client's caches, so a re-crawl with a warm `cache_dir`
+    mostly revalidates. Routes and facets whose fetch fails or returns nothing are
+    listed in `CatalogIndex.failed`.
+
+    Args:
+        api (EIAAPI): The client to crawl with.
+        route_ids (list, optional): The routes to start from. Defaults to None (every top-level route).
+        include_facet_values (bool, optional): Also fetch every facet's values. Defaults to True.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to 8.
+
+    Returns:
+        CatalogIndex: The index of the crawled routes.
+    """
+    if route_ids is None:
+        route_ids = [route["id"] for route in api.fetch_routes()]
+
+    routes = {}
+    failed = []
+    with metrics.timer("catalog_crawl_seconds"), ThreadPoolExecutor(max_workers=max_workers,
+                                                                    thread_name_prefix="catalog-crawl") as executor:
+        pending = {executor.submit(api.fetch_route_details, route_id): ("route", route_id, None)
+                   for route_id in route_ids}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, route_id, facet_id = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+
+                if kind == "facet":
+                    # An empty answer cannot be told apart from a failed fetch, so the facet is left
+                    # out of `facet_values` and listed as failed rather than indexed as having no values
+                    if not result:
+                        failed.append(f"{route_id}/facet/{facet_id}")
+                        continue
+                    # fetch_facet_options labels values as "name (id)"; keep the name alone
+                    routes[route_id]["facet_values"][facet_id] = [
+                        [value_id, label[:-len(f" ({value_id})")] if label.endswith(f" ({value_id})") else label]
+                        for label, value_id in result
+                    ]
+                    continue
+
+                if not result:
+                    failed.append(route_id)
+                    continue
+                record = routes[route_id] = _route_record(result)
+                for child in result.get("routes", []):
+                    child_id = f"{route_id}/{child['id']}"
+                    record["routes"].append(child_id)
+                    pending[executor.submit(api.fetch_route_details, child_id)] = ("route", child_id, None)
+                if include_facet_values:
+                    for facet in record["facets"]:
+                        future = executor.submit(api.fetch_facet_options, route_id, facet["id"])
+                        pending[future] = ("facet", route_id, facet["id"])
+
+    metrics.count("catalog_routes_total", len(routes), result="crawled")
+    if failed:
+        metrics.count("catalog_routes_total", len(failed), result="failed")
+    return CatalogIndex(routes, built_at=time.time(), failed=sorted(failed))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or search an offline index of the EIA route catalog.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Crawl the route tree and save the index.")
+    build.add_argument("--out", default=DEFAULT_CATALOG_PATH, help="The index file to write.")
+    build.add_argument("--skip-values", action="store_true", help="Do not fetch facet values.")
+    build.add_argument("--max-workers", type=int, default=8, help="Maximum concurrent requests.")
+    build.add_argument("--cache-dir", default=".eia_cache", help="Metadata cache directory.")
+    build.add_argument("--env-file", default="api.env", help="File to load EIA_API_KEY from.")
+
+    search = subparsers.add_parser("search", help="Search a saved index.")
+    search.add_argument("query", nargs="*", help="Words every result must contain.")
+    search.add_argument("--index", default=DEFAULT_CATALOG_PATH, help="The index file to read.")
+    search.add_argument("--kind", choices=KINDS, help="Only return entries of this kind.")
+    search.add_argument("--route", help="Only search this route.")
+    search.add_argument("--facet", help="Only search this facet's values (requires --route).")
+    search.add_argument("--limit", type=int, default=20, help="Maximum number of results.")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        try:
+            from dotenv import load_dotenv
+            load_dotenv(args.env_file)
+        except ImportError:
+            pass
+        api_key = os.getenv("EIA_API_KEY")
+        if not api_key:
+            print("EIA_API_KEY is not set.", file=sys.stderr)
+            return 2
+
+        from eia_api import EIAAPI
+        api = EIAAPI(api_key=api_key, cache_dir=args.cache_dir)
+        index = crawl_catalog(api, include_facet_values=not args.skip_values, max_workers=args.max_workers)
+        index.save(args.out)
+        stats = index.stats()
+        print(f"routes: {stats['routes']}, facets: {stats['facet']}, values: {stats['value']}, "
+              f"fields: {stats['field']}, failed: {len(index.failed)}")
+        return 1 if index.failed else 0
+
+    index = CatalogIndex.load(args.index)
+    if index is None:
+        print(f"No catalog index at {args.index}; run 'python catalog_index.py build' first.", file=sys.stderr)
+        return 2
+    start = time.perf_counter()
+    results = index.search(" ".join(args.query), kind=args.kind, route_id=args.route, facet_id=args.facet,
+                           limit=args.limit)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        scope = result["route_id"] + (f" {result['facet_id']}" if result["facet_id"] else "")
+        print(f"{result['kind']:<6} {scope:<40} {result['id']:<20} {result['name']}")
+    print(f"{len(results)} results in {elapsed * 1000:.2f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
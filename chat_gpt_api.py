@@ -1,64 +1,219 @@
 #chat_gpt_api.py
 
-import time
 import os
+import json
+import threading
+import time
 import requests
+import metrics
+from http_session import get_transport
+from prompt_templates import DEFAULT_TEMPLATE
 
 class ChatGPTAPI:
-    def __init__(self, api_key):
+    def __init__(self, api_key, transport=None, cache=None):
         self.api_key = api_key
         self.base_url = "https://api.openai.com/v1/chat/completions"
+        self.model = "gpt-4"  # or "gpt-3.5-turbo" depending on your preference and access
+        self.temperature = 0.7
+        # Shared pooled transport; retries rate limits with backoff honoring Retry-After
+        self.transport = transport or get_transport()
+        # Optional LLMResponseCache; identical requests are answered from disk
+        self.cache = cache
+        # Optional callable receiving each response's headers (e.g. an LLMScheduler reading rate limits)
+        self.rate_limit_listener = None
+        # Token usage reported by the API, including input tokens served from the provider's prompt cache
+        self.usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
 
-    def analyze_data(self, prompt):
+    def _build_request(self, prompt, template=None):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
         
-        # Prepare data in ChatGPT's required format
+        # Prepare data in ChatGPT's required format; the template's fixed prefix leads so the provider can cache it
         data = {
-            "model": "gpt-4",  # or "gpt-3.5-turbo" depending on your preference and access
-            "messages": [
-                {"role": "system", "content": "You are an AI that helps analyze datasets for cost optimization."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7
+            "model": self.model,
+            "messages": (template or DEFAULT_TEMPLATE).messages(prompt),
+            "temperature": self.temperature
         }
+        return headers, data
+
+    def _cache_key(self, data, template, use_cache):
+        if self.cache is None or not use_cache:
+            return None
+        return self.cache.make_key(data["model"], data["messages"], data["temperature"], (template or DEFAULT_TEMPLATE).key)
+
+    def _record_usage(self, usage):
+        prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+        completion_tokens = usage.get("completion_tokens", 0) or 0
+        with self._usage_lock:
+            self.usage["requests"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["cached_tokens"] += cached_tokens
+            self.usage["completion_tokens"] += completion_tokens
+        metrics.count("llm_tokens_total", prompt_tokens - cached_tokens, provider="chatgpt", kind="prompt_uncached")
+        metrics.count("llm_tokens_total", cached_tokens, provider="chatgpt", kind="prompt_cached")
+        metrics.count("llm_tokens_total", completion_tokens, provider="chatgpt", kind="completion")
+
+    def usage_stats(self):
+        """
+        Returns the token usage of this client's requests so far.
+
+        Returns:
+            dict: 'requests', 'prompt_tokens', 'cached_tokens', 'completion_tokens' and
+            'cached_ratio' (the share of prompt tokens served from the provider's prompt cache).
+        """
+        with self._usage_lock:
+            stats = dict(self.usage)
+        stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        return stats
+
+    def analyze_data(self, prompt, use_cache=True, template=None):
+        """
+        Analyzes a prompt and returns the whole answer.
 
-        # Retry up to 3 times if the request fails
-        for attempt in range(3):
-            # Commented out debugging prints to make output clearer
-            # print(f"Attempt {attempt + 1} to send data to ChatGPT model...")
-            # print(f"Prompt being sent: {prompt[:500]}...")  # Show truncated prompt for debugging
+        Args:
+            prompt (str): The variable part of the request (e.g. the data section).
+            use_cache (bool, optional): Whether to read and fill the response cache. Defaults to True.
+            template (PromptTemplate, optional): The fixed prefix to send before the prompt.
+                Defaults to DEFAULT_TEMPLATE.
 
-            response = requests.post(self.base_url, headers=headers, json=data)
-            
-            # Commented out debugging prints
-            # print(f"HTTP Status Code: {response.status_code}")  # Print HTTP status code for debugging
+        Returns:
+            dict: {"generated_text": str, "usage": dict} on success (without "usage" when served
+            from the response cache), or {"error": str}.
+        """
+        headers, data = self._build_request(prompt, template)
+
+        cache_key = self._cache_key(data, template, use_cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            metrics.count("llm_cache_total", provider="chatgpt", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        # Commented out debugging prints to make output clearer
+        # print(f"Prompt being sent: {prompt[:500]}...")  # Show truncated prompt for debugging
+
+        try:
+            # Rate limits (429) are retried by the transport with jittered exponential backoff
+            with metrics.timer("llm_request_seconds", provider="chatgpt"):
+                response = self.transport.post(self.base_url, headers=headers, json=data)
+        except requests.RequestException as e:
+            metrics.count("llm_errors_total", provider="chatgpt")
+            return {"error": f"Request to ChatGPT failed: {e}"}
+        if self.rate_limit_listener is not None:
+            self.rate_limit_listener(response.headers)
+
+        # Commented out debugging prints
+        # print(f"HTTP Status Code: {response.status_code}")  # Print HTTP status code for debugging
+        try:
             result = response.json()
+        except ValueError:
+            return {"error": f"Unexpected response from ChatGPT (HTTP {response.status_code})"}
+
+        # Commented out response JSON debugging print
+        # print(f"Response JSON received: {result}")
+
+        # Check for error or if response is ready
+        if "error" in result:
+            error_message = result["error"].get("message", "Unknown error")
+
+            # Commented out error handling debug prints
+            # print(f"Error: {error_message}")
+            metrics.count("llm_errors_total", provider="chatgpt")
+            return {"error": error_message}
+
+        # Commented out success debug print
+        # print("Model response successfully received.")
+
+        # Extract the generated response from ChatGPT
+        response_text = result['choices'][0]['message']['content']
+        usage = result.get("usage") or {}
+        self._record_usage(usage)
+        analysis = {"generated_text": response_text}
+        if cache_key is not None:
+            self.cache.set(cache_key, analysis)
+        return {**analysis, "usage": usage}
+
+    def stream_data(self, prompt, use_cache=True, template=None):
+        """
+        Streams the analysis of a prompt as it is generated.
+
+        The completion is requested with `stream: true` and read as server-sent events,
+        so the first words arrive about a second after the request instead of after the
+        whole answer. A cached response is yielded as a single chunk.
+
+        Token usage (including cached input tokens) is requested with the final event and
+        added to `usage_stats()`.
+
+        Args:
+            prompt (str): The variable part of the request (e.g. the data section).
+            use_cache (bool, optional): Whether to read and fill the response cache. Defaults to True.
+            template (PromptTemplate, optional): The fixed prefix to send before the prompt.
+                Defaults to DEFAULT_TEMPLATE.
+
+        Yields:
+            str: Text deltas in order; joined they form the full response.
+
+        Raises:
+            requests.RequestException: If the request fails or ChatGPT returns an error.
+        """
+        headers, data = self._build_request(prompt, template)
+
+        cache_key = self._cache_key(data, template, use_cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            metrics.count("llm_cache_total", provider="chatgpt", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                yield cached["generated_text"]
+                return
+
+        start = time.perf_counter()
+        payload = {**data, "stream": True, "stream_options": {"include_usage": True}}
+        response = self.transport.post(self.base_url, headers=headers, json=payload, stream=True)
+        if self.rate_limit_listener is not None:
+            self.rate_limit_listener(response.headers)
+        try:
+            if response.status_code != 200:
+                try:
+                    error_message = response.json()["error"].get("message", "Unknown error")
+                except (ValueError, KeyError, AttributeError):
+                    error_message = f"Unexpected response from ChatGPT (HTTP {response.status_code})"
+                raise requests.HTTPError(error_message, response=response)
+
+            parts = []
+            done = False
+            for line in response.iter_lines(decode_unicode=True):
+                # Events are "data: <json>" lines separated by blank lines; the stream ends with "data: [DONE]"
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    done = True
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    continue
+                if "error" in chunk:
+                    raise requests.RequestException(chunk["error"].get("message", "Unknown error"))
+                if chunk.get("usage"):
+                    # Sent in a final chunk without choices when include_usage is set
+                    self._record_usage(chunk["usage"])
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    if not parts:
+                        metrics.observe("llm_first_token_seconds", time.perf_counter() - start, provider="chatgpt")
+                    parts.append(delta)
+                    yield delta
+        finally:
+            response.close()
+        metrics.observe("llm_stream_seconds", time.perf_counter() - start, provider="chatgpt")
 
-            # Commented out response JSON debugging print
-            # print(f"Response JSON received: {result}")
-
-            # Check for error or if response is ready
-            if "error" in result:
-                error_message = result["error"].get("message", "Unknown error")
-                
-                # Commented out error handling debug prints
-                # print(f"Error: {error_message}")
-                
-                if "Rate limit" in error_message or response.status_code == 429:
-                    # Commented out rate limit hit debug print
-                    # print("Rate limit hit, retrying in 20 seconds...")
-                    time.sleep(20)
-                else:
-                    return {"error": error_message}
-            else:
-                # Commented out success debug print
-                # print("Model response successfully received.")
-                
-                # Extract the generated response from ChatGPT
-                response_text = result['choices'][0]['message']['content']
-                return {"generated_text": response_text}
-
-        return {"error": "Model could not be loaded after multiple attempts"}
+        # Only a stream that reached [DONE] is cached; an abandoned generator, a dropped connection or a
+        # truncated stream leaves no partial answer behind
+        if cache_key is not None and done:
+            self.cache.set(cache_key, {"generated_text": "".join(parts)})
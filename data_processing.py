@@ -1,8 +1,9 @@
-def generate_prompt(df, date_range):
+from prompt_builder import build_data_section
+
+def generate_prompt(df, date_range, token_budget=1500, frequency="monthly", data_fields=None):
+    # Summaries instead of raw column dumps keep the prompt size flat as the dataset grows
     return (
         f"Analyze the energy data trends for {date_range}:\n\n"
-        f"Monthly Price: {df['price'].values.tolist()}\n"
-        f"Monthly Revenue: {df['revenue'].values.tolist()}\n"
-        f"Monthly Sales: {df['sales'].values.tolist()}\n\n"
+        f"{build_data_section(df, token_budget=token_budget, frequency=frequency, data_fields=data_fields)}\n\n"
         "Provide insights on changes, peaks, and any notable patterns."
     )
@@ -3,7 +3,14 @@
 import requests
 import pandas as pd
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
 from datetime import datetime, timedelta
+import metrics
+from http_session import get_transport
+from memo_cache import SingleFlightCache
+from metadata_cache import MetadataCache
+from periods import is_period, parse_periods, period_range
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)  # Set to DEBUG for detailed logs
@@ -11,17 +18,171 @@ logging.basicConfig(level=logging.DEBUG)  # Set to DEBUG for detailed logs
 # Suppress debug messages from urllib3
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 
+# Maximum number of rows the EIA API returns for a single JSON request
+PAGE_SIZE = 5000
+
+def normalize_data(data, route_details, frequency, float_dtype="float64"):
+    """
+    Converts the string columns returned by the EIA API into compact, typed columns.
+
+    Data fields declared in the route metadata are parsed to floats, repeated labels
+    (facet IDs, their descriptions and `*-units` columns) become categoricals, and
+    `period` is parsed into timestamps marking the start of each period.
+
+    Args:
+        data (pandas.DataFrame): Rows returned by the API.
+        route_details (dict): The route metadata from `fetch_route_details`.
+        frequency (str): The frequency of the data (e.g., 'monthly').
+        float_dtype (str, optional): The dtype of numeric data fields ('float32' or 'float64').
+            Defaults to "float64".
+
+    Returns:
+        pandas.DataFrame: A new DataFrame with normalized dtypes.
+    """
+    if data.empty:
+        return data
+
+    data = data.copy()
+    numeric_fields = set((route_details or {}).get("data", {}))
+    for column in data.columns:
+        if column == "period":
+            data[column] = parse_periods(data[column], frequency)
+        elif column in numeric_fields:
+            data[column] = pd.to_numeric(data[column], errors="coerce").astype(float_dtype)
+        elif pd.api.types.is_object_dtype(data[column]) or pd.api.types.is_string_dtype(data[column]):
+            data[column] = data[column].astype("category")
+    return data
+
 class EIAAPI:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_dir=None, cache_ttls=None, transport=None, warehouse=None, memo_size=256):
         """
         Initializes the EIAAPI instance with the provided API key.
 
         Args:
             api_key (str): Your EIA API key.
+            cache_dir (str, optional): Directory for the persistent metadata cache. Routes,
+                route details and facet options are served from it when set. Defaults to None.
+            cache_ttls (dict, optional): Per-endpoint TTLs in seconds for the metadata cache
+                (keys: 'routes', 'route_details', 'facet_options').
+            transport (HTTPTransport, optional): The HTTP transport to use. Defaults to the
+                shared pooled transport from `http_session.get_transport()`.
+            warehouse (ParquetWarehouse, optional): Columnar storage that every successful
+                `fetch_data` result is written to. Defaults to None.
+            memo_size (int, optional): The maximum number of metadata responses kept in memory.
+                Defaults to 256.
         """
         self.api_key = api_key
         self.base_url = "https://api.eia.gov/v2/electricity/"
+        self._transport = transport
+        self.warehouse = warehouse
+        self.cache = MetadataCache(cache_dir, ttls=cache_ttls) if cache_dir else None
+        self.memo = SingleFlightCache(maxsize=memo_size)
+
+    @property
+    def transport(self):
+        # Resolved on first use, so subclasses with their own HTTP stack never build the pooled one
+        if self._transport is None:
+            self._transport = get_transport()
+        return self._transport
+
+    def _get_metadata(self, endpoint, url, params, *key_parts):
+        """
+        Fetches a metadata response, going through the in-memory and persistent caches.
+
+        Responses are memoized in memory for the life of the client (until `refresh()`),
+        and concurrent identical lookups share a single in-flight call. Below that, fresh
+        entries are served from disk. Stale entries are revalidated with If-None-Match /
+        If-Modified-Since, and a 304 answer renews them without a body.
+
+        Args:
+            endpoint (str): The endpoint name used for the cache key and TTL.
+            url (str): The request URL.
+            params (dict): The query parameters.
+            *key_parts (str): The route/facet identifiers that make up the cache key.
+
+        Returns:
+            dict: The decoded JSON response.
+
+        Raises:
+            requests.RequestException: If the request fails.
+        """
+        key = MetadataCache.make_key(endpoint, *key_parts)
+        if not metrics.is_enabled():
+            return self.memo.get_or_call(key, lambda: self._load_metadata(endpoint, url, params, key))
+
+        loaded = []
+
+        def load():
+            loaded.append(True)
+            return self._load_metadata(endpoint, url, params, key)
+
+        value = self.memo.get_or_call(key, load)
+        if not loaded:
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="memo_hit")
+        return value
+
+    def _load_metadata(self, endpoint, url, params, key):
+        """
+        Loads a metadata response from the persistent cache or the network.
+
+        Returns:
+            dict: The decoded JSON response.
+        """
+        if self.cache is None:
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="fetched")
+            response = self.transport.get(url, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="disk_hit")
+            return entry["value"]
 
+        response = self.transport.get(url, params=params, headers=self.cache.conditional_headers(entry))
+        if response.status_code == 304 and entry is not None:
+            metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="revalidated")
+            self.cache.touch(entry)
+            return entry["value"]
+        metrics.count("eia_metadata_cache_total", endpoint=endpoint, result="fetched")
+        response.raise_for_status()
+        data = response.json()
+        self.cache.set(key, endpoint, data, etag=response.headers.get("ETag"),
+                       last_modified=response.headers.get("Last-Modified"))
+        return data
+
+    def refresh(self, route_id=None):
+        """
+        Drops cached metadata so the next lookups go back to the API.
+
+        The in-memory memo is always cleared entirely.
+
+        Args:
+            route_id (str, optional): Only drop the details and facet options of this route
+                from the persistent cache. Defaults to None (drop everything).
+
+        Returns:
+            int: The number of persistent cache entries removed.
+        """
+        self.memo.clear()
+        if self.cache is None:
+            return 0
+        if route_id is None:
+            return self.cache.clear()
+        removed = int(self.cache.delete(self.cache.make_key("route_details", route_id)))
+        removed += self.cache.clear(prefix=self.cache.make_key("facet_options", route_id) + "/")
+        return removed
+
+    def memo_stats(self):
+        """
+        Returns hit/miss statistics of the in-memory metadata memo.
+
+        Returns:
+            dict: See `SingleFlightCache.stats`.
+        """
+        return self.memo.stats()
+
+    @metrics.timed("eia_call_seconds", method="fetch_routes")
     def fetch_routes(self):
         """
         Fetches the list of available routes from the EIA API.
@@ -29,11 +190,10 @@ class EIAAPI:
         Returns:
             list: A list of routes where each route is a dictionary with route details.
         """
-        url = f"{self.base_url}?api_key={self.api_key}"
+        url = self.base_url
+        params = {"api_key": self.api_key}
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_metadata("routes", url, params)
             # Commented out to clear the screen
             # logging.info("Successfully fetched routes from the EIA API.")
             return data["response"]["routes"]
@@ -42,6 +202,7 @@ class EIAAPI:
             # logging.error(f"Error fetching routes: {e}")
             return []
 
+    @metrics.timed("eia_call_seconds", method="fetch_route_details")
     def fetch_route_details(self, route_id):
         """
         Fetches the details of a specific route.
@@ -55,9 +216,7 @@ class EIAAPI:
         url = f"{self.base_url}{route_id}/"
         params = {"api_key": self.api_key}
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_metadata("route_details", url, params, route_id)
             # Commented out to clear the screen
             # logging.info(f"Successfully fetched details for route '{route_id}'.")
             return data["response"]
@@ -66,6 +225,26 @@ class EIAAPI:
             # logging.error(f"Error fetching route details for '{route_id}': {e}")
             return None
 
+    @staticmethod
+    def _parse_facet_options(data):
+        """
+        Extracts (option_name, option_id) tuples from a facet response.
+
+        Raises:
+            KeyError: If a facet value lacks its name or ID.
+        """
+        # Access the facet values
+        if "response" in data and "facets" in data["response"]:
+            values = data["response"]["facets"]
+        else:
+            # Commented out error logging
+            # logging.error("Facet not found in response.")
+            return []
+
+        # Construct options as (option_name, option_id)
+        return [(f"{item['name']} ({item['id']})", item["id"]) for item in values]
+
+    @metrics.timed("eia_call_seconds", method="fetch_facet_options")
     def fetch_facet_options(self, route_id, facet_id):
         """
         Fetches the available options for a specific facet of a route.
@@ -80,23 +259,12 @@ class EIAAPI:
         url = f"{self.base_url}{route_id}/facet/{facet_id}"
         params = {"api_key": self.api_key}
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_metadata("facet_options", url, params, route_id, facet_id)
 
             # Commented out debug logging
             # logging.debug(f"API response for facet '{facet_id}': {data}")
 
-            # Access the facet values
-            if "response" in data and "facets" in data["response"]:
-                values = data["response"]["facets"]
-            else:
-                # Commented out error logging
-                # logging.error(f"Facet '{facet_id}' not found in response.")
-                return []
-
-            # Construct options as (option_name, option_id)
-            options = [(f"{item['name']} ({item['id']})", item["id"]) for item in values]
+            options = self._parse_facet_options(data)
 
             # Commented out success logging
             # logging.info(f"Successfully fetched facet options for '{facet_id}' in route '{route_id}'.")
@@ -121,34 +289,37 @@ class EIAAPI:
             list: A list of tuples containing (field_alias, field_id).
         """
         route_details = self.fetch_route_details(route_id)
+        return self._parse_data_fields(route_details)
+
+    @staticmethod
+    def _parse_data_fields(route_details):
+        """
+        Extracts (field_alias, field_id) tuples from route details.
+        """
         if route_details and "data" in route_details:
             data_fields = route_details["data"]
             # Commented out success logging
-            # logging.info(f"Successfully fetched data fields for route '{route_id}'.")
+            # logging.info("Successfully fetched data fields.")
             return [(v["alias"], k) for k, v in data_fields.items()]
         else:
             # Commented out warning logging
-            # logging.warning(f"No data fields found for route '{route_id}'.")
+            # logging.warning("No data fields found.")
             return []
 
-    def fetch_data(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None, max_rows=None):
+    def _build_data_params(self, frequency, facets, data_fields, start_date=None, end_date=None):
         """
-        Fetches data from the EIA API based on the specified parameters.
+        Builds the query parameters shared by every page of a data request.
 
         Args:
-            route_id (str): The ID of the route.
             frequency (str): The frequency of the data (e.g., 'monthly').
             facets (dict): A dictionary of facet IDs to their selected values (list or single value).
             data_fields (list): A list of data field IDs to include in the response.
-            start_date (str): The start date in 'YYYY-MM' format.
-            end_date (str): The end date in 'YYYY-MM' format.
-            max_rows (int, optional): The maximum number of rows to return. Defaults to None.
+            start_date (str): The start date in 'YYYY-MM' format, or a period string of the frequency.
+            end_date (str): The end date in 'YYYY-MM' format, or a period string of the frequency.
 
         Returns:
-            pandas.DataFrame: A DataFrame containing the fetched data.
+            dict or None: The query parameters, or None if a date could not be parsed.
         """
-        url = f"{self.base_url}{route_id}/data/"
-
         params = {
             "api_key": self.api_key,
             "frequency": frequency,
@@ -168,26 +339,366 @@ class EIAAPI:
 
         # Adjust start and end dates according to EIA API requirements
         if start_date:
+            adjusted_start_date = self._adjust_date(start_date, frequency, is_start=True)
+            if adjusted_start_date is None:
+                # Commented out error logging
+                # logging.error("Invalid start_date format. Expected 'YYYY-MM'.")
+                return None
+            params["start"] = adjusted_start_date
+        if end_date:
+            adjusted_end_date = self._adjust_date(end_date, frequency, is_start=False)
+            if adjusted_end_date is None:
+                # Commented out error logging
+                # logging.error("Invalid end_date format. Expected 'YYYY-MM'.")
+                return None
+            params["end"] = adjusted_end_date
+
+        return params
+
+    def _adjust_date(self, date, frequency, is_start):
+        """
+        Converts a start or end date into the value the EIA API expects.
+
+        Args:
+            date (str): The date in 'YYYY-MM' format, or a period string of the frequency.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            is_start (bool): Whether the date is the start of the range.
+
+        Returns:
+            str or None: The adjusted date, or None if it could not be parsed.
+        """
+        try:
+            date_dt = datetime.strptime(date, '%Y-%m')
+        except ValueError:
+            # Other frequencies take their own period format (e.g. '2020', '2020-Q1') as is
+            return date if is_period(date, frequency) else None
+        if is_start:
             # For monthly data, the start date should be one day before the desired first month
+            date_dt -= timedelta(days=1)
+        # For monthly data, the end date should be the first day of the desired last month
+        return date_dt.strftime('%Y-%m-%d')
+
+    def _fetch_page(self, url, params, offset, length):
+        """
+        Fetches a single offset/length page of a data request.
+
+        Args:
+            url (str): The data endpoint URL.
+            params (dict): The query parameters built by `_build_data_params`.
+            offset (int): The index of the first row to return.
+            length (int): The number of rows to return.
+
+        Returns:
+            tuple: (records, total) where records is the list of rows on this page
+            and total is the number of rows the server reports for the whole query.
+
+        Raises:
+            requests.RequestException: If the request fails.
+        """
+        page_params = dict(params)
+        page_params["offset"] = offset
+        page_params["length"] = length
+
+        response = self.transport.get(url, params=page_params)
+        response.raise_for_status()
+        with metrics.timer("eia_json_parse_seconds"):
+            records, total = self._parse_page(response.json())
+        metrics.count("eia_rows_parsed_total", len(records))
+        return records, total
+
+    @staticmethod
+    def _parse_page(data):
+        """
+        Extracts (records, total) from a data response.
+        """
+        if "response" not in data or "data" not in data["response"]:
+            return [], 0
+        # The API reports the total as a string on some routes
+        total = int(data["response"].get("total", 0) or 0)
+        return data["response"]["data"], total
+
+    def iter_data(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None,
+                  max_rows=None, page_size=PAGE_SIZE):
+        """
+        Iterates over the data for a query one page at a time.
+
+        Pages are requested lazily with increasing offsets until the `total` reported
+        by the API (or `max_rows`) is reached, so only one page is held in memory.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs to include in the response.
+            start_date (str): The start date in 'YYYY-MM' format.
+            end_date (str): The end date in 'YYYY-MM' format.
+            max_rows (int, optional): The maximum number of rows to return. Defaults to None.
+            page_size (int, optional): The number of rows requested per page. Defaults to PAGE_SIZE.
+
+        Yields:
+            pandas.DataFrame: The rows of each page, in offset order.
+
+        Raises:
+            requests.RequestException: If a page request fails.
+        """
+        url = f"{self.base_url}{route_id}/data/"
+        params = self._build_data_params(frequency, facets, data_fields, start_date, end_date)
+        if params is None:
+            return
+
+        page_size = min(page_size, PAGE_SIZE)
+        offset = 0
+        total = None
+        while total is None or offset < total:
+            length = page_size if max_rows is None else min(page_size, max_rows - offset)
+            if length <= 0:
+                break
+
+            records, page_total = self._fetch_page(url, params, offset, length)
+            if total is None:
+                total = page_total if max_rows is None else min(page_total, max_rows)
+            if not records:
+                break
+
+            with metrics.timer("eia_dataframe_seconds"):
+                frame = pd.DataFrame(records)
+            yield frame
+            offset += len(records)
+
+    def _fetch_data_concurrent(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None,
+                               max_rows=None, page_size=PAGE_SIZE, max_workers=4, total_rows=None):
+        """
+        Fetches all pages of a data request through a bounded thread pool.
+
+        The first page is fetched up front to learn the total row count unless
+        `total_rows` is already known. The remaining offset pages are independent and
+        are dispatched concurrently, then reassembled in offset order. If any page
+        fails, pages that have not started yet are cancelled and the error is raised.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs to include in the response.
+            start_date (str): The start date in 'YYYY-MM' format.
+            end_date (str): The end date in 'YYYY-MM' format.
+            max_rows (int, optional): The maximum number of rows to return. Defaults to None.
+            page_size (int, optional): The number of rows requested per page. Defaults to PAGE_SIZE.
+            max_workers (int, optional): The maximum number of concurrent page requests. Defaults to 4.
+            total_rows (int, optional): The total row count if already known, which skips the probe.
+
+        Returns:
+            pandas.DataFrame: A DataFrame containing the fetched data.
+
+        Raises:
+            requests.RequestException: If any page request fails.
+        """
+        url = f"{self.base_url}{route_id}/data/"
+        params = self._build_data_params(frequency, facets, data_fields, start_date, end_date)
+        if params is None:
+            return pd.DataFrame()
+
+        page_size = min(page_size, PAGE_SIZE)
+        pages = {}
+        if total_rows is None:
+            first_length = page_size if max_rows is None else min(page_size, max_rows)
+            records, total_rows = self._fetch_page(url, params, 0, first_length)
+            if not records:
+                return pd.DataFrame()
+            pages[0] = records
+            first_offset = len(records)
+        else:
+            total_rows = int(total_rows)
+            first_offset = 0
+        if max_rows is not None:
+            total_rows = min(total_rows, max_rows)
+
+        offsets = range(first_offset, total_rows, page_size)
+        cancelled = threading.Event()
+
+        def fetch(offset):
+            # Skip pages that were queued before another page failed
+            if cancelled.is_set():
+                return offset, []
+            length = min(page_size, total_rows - offset)
+            return offset, self._fetch_page(url, params, offset, length)[0]
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [executor.submit(fetch, offset) for offset in offsets]
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    cancelled.set()
+                    for pending in not_done:
+                        pending.cancel()
+                    raise future.exception()
+            for future in futures:
+                offset, records = future.result()
+                pages[offset] = records
+        finally:
+            executor.shutdown(wait=True)
+
+        with metrics.timer("eia_dataframe_seconds"):
+            frames = [pd.DataFrame(pages[offset]) for offset in sorted(pages) if pages[offset]]
+            if not frames:
+                return pd.DataFrame()
+            return pd.concat(frames, ignore_index=True)
+
+    @metrics.timed("eia_call_seconds", method="fetch_period_bounds")
+    def fetch_period_bounds(self, route_id, frequency, facets, data_fields=None):
+        """
+        Fetches the earliest and latest period available for a query.
+
+        Uses two single-row requests with server-side sorting on `period`, so the cost is
+        independent of how many rows the query matches. Found bounds are memoized in memory
+        like route metadata (until `refresh()`), so a prefetched query answers instantly.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list, optional): Data field IDs the rows must carry. Defaults to None.
+
+        Returns:
+            tuple or None: (first_period, last_period), or None if nothing matched or a request failed.
+        """
+        key = self._period_bounds_key(route_id, frequency, facets, data_fields)
+        return self.memo.get_or_call(key, lambda: self._load_period_bounds(route_id, frequency, facets, data_fields))
+
+    @staticmethod
+    def _period_bounds_key(route_id, frequency, facets, data_fields=None):
+        """
+        Builds the memo key of a period bounds query.
+        """
+        facet_parts = []
+        for facet_id in sorted(facets):
+            values = facets[facet_id] if isinstance(facets[facet_id], list) else [facets[facet_id]]
+            facet_parts.append(f"{facet_id}=" + ",".join(sorted(str(value) for value in values)))
+        return MetadataCache.make_key("period_bounds", route_id, frequency, *facet_parts,
+                                      "data=" + ",".join(sorted(data_fields or [])))
+
+    def _load_period_bounds(self, route_id, frequency, facets, data_fields=None):
+        url = f"{self.base_url}{route_id}/data/"
+        params = self._build_data_params(frequency, facets, data_fields or [])
+        params["sort[0][column]"] = "period"
+
+        bounds = []
+        try:
+            for direction in ("asc", "desc"):
+                params["sort[0][direction]"] = direction
+                records, _ = self._fetch_page(url, params, 0, 1)
+                if not records:
+                    return None
+                bounds.append(records[0]["period"])
+        except (requests.RequestException, KeyError) as e:
+            # Commented out error logging
+            # logging.error(f"Error fetching period bounds for '{route_id}': {e}")
+            return None
+        return bounds[0], bounds[1]
+
+    @metrics.timed("eia_call_seconds", method="fetch_available_periods")
+    def fetch_available_periods(self, route_id, frequency, facets, data_fields=None):
+        """
+        Lists the periods available for a query without downloading its rows.
+
+        The period bounds come from `fetch_period_bounds` and the periods in between are
+        generated locally for the frequency.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list, optional): Data field IDs the rows must carry. Defaults to None.
+
+        Returns:
+            list: The period strings in ascending order, empty if none are available.
+        """
+        bounds = self.fetch_period_bounds(route_id, frequency, facets, data_fields)
+        if bounds is None:
+            return []
+        return period_range(bounds[0], bounds[1], frequency)
+
+    @metrics.timed("eia_call_seconds", method="fetch_data")
+    def fetch_data(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None, max_rows=None,
+                   paginate=False, page_size=PAGE_SIZE, max_workers=None, total_rows=None, normalize=False,
+                   float_dtype="float64"):
+        """
+        Fetches data from the EIA API based on the specified parameters.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs to include in the response.
+            start_date (str): The start date in 'YYYY-MM' format.
+            end_date (str): The end date in 'YYYY-MM' format.
+            max_rows (int, optional): The maximum number of rows to return. Defaults to None.
+            paginate (bool, optional): Follow `response.total` across offset/length pages instead of
+                returning only the first page. Defaults to False.
+            page_size (int, optional): The number of rows requested per page when paginating.
+                Defaults to PAGE_SIZE.
+            max_workers (int, optional): Fetch the pages concurrently with at most this many
+                requests in flight. Any value implies `paginate`; 1 pages serially. Defaults to None
+                (no pagination unless `paginate` is set).
+            total_rows (int, optional): The total row count if already known (e.g. from a
+                `length=1` probe), so concurrent fetching can skip its own probe.
+            normalize (bool, optional): Convert the returned strings into typed columns with
+                `normalize_data`, using the route metadata. Defaults to False.
+            float_dtype (str, optional): The dtype of numeric data fields when normalizing.
+                Defaults to "float64".
+
+        Returns:
+            pandas.DataFrame: A DataFrame containing the fetched data.
+        """
+        data = self._fetch_data(route_id, frequency, facets, data_fields, start_date=start_date, end_date=end_date,
+                                max_rows=max_rows, paginate=paginate, page_size=page_size,
+                                max_workers=max_workers, total_rows=total_rows)
+
+        # The warehouse keeps the API representation; normalization is applied on the way out
+        if self.warehouse is not None and not data.empty:
+            self.warehouse.write(data, route_id, frequency, data_fields)
+        if normalize and not data.empty:
+            route_details = self.fetch_route_details(route_id) or {"data": dict.fromkeys(data_fields)}
+            data = normalize_data(data, route_details, frequency, float_dtype=float_dtype)
+        return data
+
+    def _fetch_data(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None, max_rows=None,
+                    paginate=False, page_size=PAGE_SIZE, max_workers=None, total_rows=None):
+        """
+        Fetches the raw data for `fetch_data` using the requested fetch mode.
+
+        Returns:
+            pandas.DataFrame: A DataFrame containing the fetched data, empty on failure.
+        """
+        if max_workers is not None and max_workers > 1:
             try:
-                start_dt = datetime.strptime(start_date, '%Y-%m')
-                adjusted_start_dt = start_dt - timedelta(days=1)
-                adjusted_start_date = adjusted_start_dt.strftime('%Y-%m-%d')
-                params["start"] = adjusted_start_date
-            except ValueError:
+                return self._fetch_data_concurrent(route_id, frequency, facets, data_fields, start_date=start_date,
+                                                   end_date=end_date, max_rows=max_rows, page_size=page_size,
+                                                   max_workers=max_workers, total_rows=total_rows)
+            except requests.RequestException as e:
                 # Commented out error logging
-                # logging.error("Invalid start_date format. Expected 'YYYY-MM'.")
+                # logging.error(f"Error fetching data for route '{route_id}': {e}")
                 return pd.DataFrame()
-        if end_date:
-            # For monthly data, the end date should be the first day of the desired last month
+
+        # A single worker still pages through the whole result, just serially
+        if paginate or max_workers is not None:
             try:
-                end_dt = datetime.strptime(end_date, '%Y-%m')
-                adjusted_end_date = end_dt.strftime('%Y-%m-%d')
-                params["end"] = adjusted_end_date
-            except ValueError:
+                chunks = list(self.iter_data(route_id, frequency, facets, data_fields, start_date=start_date,
+                                             end_date=end_date, max_rows=max_rows, page_size=page_size))
+            except requests.RequestException as e:
                 # Commented out error logging
-                # logging.error("Invalid end_date format. Expected 'YYYY-MM'.")
+                # logging.error(f"Error fetching data for route '{route_id}': {e}")
+                return pd.DataFrame()
+            if not chunks:
                 return pd.DataFrame()
+            return pd.concat(chunks, ignore_index=True)
+
+        url = f"{self.base_url}{route_id}/data/"
+
+        params = self._build_data_params(frequency, facets, data_fields, start_date, end_date)
+        if params is None:
+            return pd.DataFrame()
 
         # Add max_rows to limit the number of results
         if max_rows is not None:
@@ -198,13 +709,16 @@ class EIAAPI:
             # full_url = requests.Request('GET', url, params=params).prepare().url
             # logging.debug(f"Full Data Fetch URL: {full_url}")
 
-            response = requests.get(url, params=params)
+            response = self.transport.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            with metrics.timer("eia_json_parse_seconds"):
+                data = response.json()
             if "response" in data and "data" in data["response"]:
                 # Commented out success logging
                 # logging.info(f"Successfully fetched data for route '{route_id}'.")
-                return pd.DataFrame(data["response"]["data"])
+                metrics.count("eia_rows_parsed_total", len(data["response"]["data"]))
+                with metrics.timer("eia_dataframe_seconds"):
+                    return pd.DataFrame(data["response"]["data"])
             else:
                 # Commented out warning logging
                 # logging.warning(f"Unexpected data structure in API response for route '{route_id}'.")
@@ -0,0 +1,166 @@
+# facet_selector.py
+
+import html
+
+import ipywidgets as widgets
+
+def filter_options(options, query, limit):
+    """
+    Returns the options whose label contains every word of a query, in their original order.
+
+    Args:
+        options (list): (option_name, option_id) tuples.
+        query (str): The search text; case-insensitive. An empty query matches everything.
+        limit (int): The maximum number of matches.
+
+    Returns:
+        list: At most `limit` matching (option_name, option_id) tuples.
+    """
+    terms = query.lower().split()
+    matches = []
+    for label, option_id in options:
+        text = label.lower()
+        if all(term in text for term in terms):
+            matches.append((label, option_id))
+            if len(matches) >= limit:
+                break
+    return matches
+
+class FacetSelector(widgets.VBox):
+    def __init__(self, description, max_matches=50, rows=8):
+        """
+        A searchable multi-select list for facets with any number of options.
+
+        All options stay in the kernel. The front end only receives the first
+        `max_matches` options matching the search box, so a facet with thousands of
+        plants is as light as one with a handful of states. Selections are kept across
+        searches. Facets with no more than `max_matches` options are shown without
+        the search box.
+
+        Args:
+            description (str): The label shown next to the selector.
+            max_matches (int, optional): The maximum number of options sent to the front end.
+                Defaults to 50.
+            rows (int, optional): The visible height of the option list. Defaults to 8.
+        """
+        self.max_matches = max_matches
+        self.rows = rows
+        self._options = []
+        self._search = None
+        self._selected = {}  # Selected option IDs -> labels, in selection order
+        self._updating = False
+        self._summary = ""
+
+        self.search_box = widgets.Text(description=description, placeholder="Type to search", disabled=True,
+                                       continuous_update=True)
+        self.matches = widgets.SelectMultiple(options=[], rows=rows, disabled=True)
+        self.status = widgets.HTML("Loading...")
+        self.clear_button = widgets.Button(description="Clear", layout=widgets.Layout(width="auto"), disabled=True)
+
+        self.search_box.observe(self.on_search, names="value")
+        self.matches.observe(self.on_matches_change, names="value")
+        self.clear_button.on_click(self.on_clear)
+        super().__init__([self.search_box, self.matches, widgets.HBox([self.status, self.clear_button])])
+
+    @property
+    def disabled(self):
+        return self.matches.disabled
+
+    @disabled.setter
+    def disabled(self, disabled):
+        self.search_box.disabled = disabled
+        self.matches.disabled = disabled
+        self.clear_button.disabled = disabled
+
+    @property
+    def value(self):
+        """
+        list: The selected option IDs, in selection order.
+        """
+        return list(self._selected)
+
+    def set_options(self, options, value=None, search=None):
+        """
+        Replaces the options and enables the selector.
+
+        Args:
+            options (list): (option_name, option_id) tuples, as returned by `EIAAPI.fetch_facet_options`.
+            value (list, optional): The option IDs selected initially. Defaults to None (nothing).
+            search (callable, optional): `search(query, limit)` returning matching (option_name, option_id)
+                tuples, e.g. backed by a `CatalogIndex`. Defaults to None (filter `options` in the kernel).
+        """
+        self._options = list(options)
+        self._search = search
+        labels = {option_id: label for label, option_id in self._options}
+        self._selected = {option_id: labels.get(option_id, str(option_id)) for option_id in value or []}
+
+        small = len(self._options) <= self.max_matches
+        # The description moves to the list when there is no search box to carry it
+        self.search_box.layout.display = "none" if small else None
+        self.matches.description = self.search_box.description if small else ""
+        self.matches.rows = max(1, min(self.rows, len(self._options)))
+        self.disabled = False
+        self._updating = True
+        try:
+            self.search_box.value = ""
+        finally:
+            self._updating = False
+        self.refresh()
+
+    def refresh(self):
+        """
+        Sends the current matches to the front end and updates the status line.
+        """
+        query = self.search_box.value
+        if self._search is not None:
+            found = self._search(query, self.max_matches + 1)
+        else:
+            found = filter_options(self._options, query, self.max_matches + 1)
+        shown = found[:self.max_matches]
+
+        self._updating = True
+        try:
+            self.matches.options = shown
+            self.matches.value = tuple(option_id for _, option_id in shown if option_id in self._selected)
+        finally:
+            self._updating = False
+
+        if not shown:
+            self._summary = "No matches."
+        elif len(found) > len(shown):
+            self._summary = f"First {len(shown)} matches; type to narrow."
+        elif query:
+            self._summary = f"{len(shown)} of {len(self._options)} options."
+        else:
+            self._summary = f"{len(shown)} options."
+        self.update_status()
+
+    def update_status(self):
+        status = self._summary
+        if self._selected:
+            names = ", ".join(html.escape(str(label)) for label in list(self._selected.values())[:3])
+            if len(self._selected) > 3:
+                names += ", ..."
+            status += f" Selected ({len(self._selected)}): {names}"
+        self.status.value = status
+        self.clear_button.layout.display = None if self._selected else "none"
+
+    def on_search(self, change):
+        if not self._updating:
+            self.refresh()
+
+    def on_matches_change(self, change):
+        if self._updating:
+            return
+        # Only the shown options can change; selections hidden by the search are kept
+        chosen = set(change["new"])
+        for label, option_id in self.matches.options:
+            if option_id in chosen:
+                self._selected.setdefault(option_id, label)
+            else:
+                self._selected.pop(option_id, None)
+        self.update_status()
+
+    def on_clear(self, b):
+        self._selected = {}
+        self.refresh()
@@ -1,34 +1,73 @@
-import time
+import logging
 import requests
+import metrics
+from http_session import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Bump when the request format changes, so cached responses for the old format are not reused
+PROMPT_TEMPLATE_VERSION = "1"
 
 class HFAPI:
-    def __init__(self, api_key):
+    def __init__(self, api_key, transport=None, cache=None):
         self.api_key = api_key
         # Updated to LLaMA-2 endpoint
         self.base_url = "https://api-inference.huggingface.co/models/meta-llama/Llama-3.2-11B-Vision-Instruct"
+        # Shared pooled transport; retries 503s with backoff while the model is loading
+        self.transport = transport or get_transport()
+        # Optional LLMResponseCache; identical requests are answered from disk
+        self.cache = cache
+        # Optional callable receiving each response's headers (e.g. an LLMScheduler reading rate limits)
+        self.rate_limit_listener = None
 
-    def analyze_data(self, prompt):
-        headers = {"Authorization": f"Bearer {self.api_key}"}
+    def analyze_data(self, prompt, use_cache=True, template=None):
+        # A template's fixed prefix goes first, so every call shares the same leading text
+        if template is not None:
+            prompt = template.render(prompt)
+        # Ask the inference API to hold the request until the model is loaded
+        # instead of answering "currently loading" and making us poll
+        headers = {"Authorization": f"Bearer {self.api_key}", "x-wait-for-model": "true"}
         data = {"inputs": prompt}
 
-        # Retry up to 3 times if the model is still loading
-        for attempt in range(3):
-            print(f"Attempt {attempt + 1} to send data to model...")
-            print(f"Prompt being sent: {prompt[:500]}...")  # Show truncated prompt for debugging
+        cache_key = None
+        if self.cache is not None and use_cache:
+            template_version = template.key if template is not None else PROMPT_TEMPLATE_VERSION
+            cache_key = self.cache.make_key(self.base_url, [{"role": "user", "content": prompt}],
+                                            template_version=template_version)
+            cached = self.cache.get(cache_key)
+            metrics.count("llm_cache_total", provider="huggingface", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                logger.debug("Model response served from cache.")
+                return cached
+
+        logger.debug("Prompt being sent: %s...", prompt[:500])  # Show truncated prompt for debugging
+
+        try:
+            with metrics.timer("llm_request_seconds", provider="huggingface"):
+                response = self.transport.post(self.base_url, headers=headers, json=data)
+        except requests.RequestException as e:
+            metrics.count("llm_errors_total", provider="huggingface")
+            logger.warning("Request failed: %s", e)
+            return {"error": f"Request to model failed: {e}"}
+        if self.rate_limit_listener is not None:
+            self.rate_limit_listener(response.headers)
 
-            response = requests.post(self.base_url, headers=headers, json=data)
-            print(f"HTTP Status Code: {response.status_code}")  # Print HTTP status code for debugging
+        logger.debug("HTTP Status Code: %s", response.status_code)  # HTTP status code for debugging
+        try:
             result = response.json()
+        except ValueError:
+            return {"error": f"Unexpected response from model (HTTP {response.status_code})"}
 
-            # Debug print of the response JSON
-            print(f"Response JSON received: {result}")
+        # Debug log of the response JSON
+        logger.debug("Response JSON received: %s", result)
 
-            # Check if model is ready, otherwise wait and retry
-            if "error" in result and "currently loading" in result["error"]:
-                print("Model is loading, retrying in 20 seconds...")
-                time.sleep(20)  # Wait for 20 seconds before retrying
-            else:
-                print("Model response successfully received.")
-                return result  # Return the result if no error is found
+        if isinstance(result, dict) and "error" in result:
+            metrics.count("llm_errors_total", provider="huggingface")
+        if isinstance(result, dict) and "error" in result and "currently loading" in result["error"]:
+            # The server answered that the model is still warming up; the caller can try again shortly
+            return {"error": "Model is still loading; try again shortly"}
 
-        return {"error": "Model could not be loaded after multiple attempts"}
+        logger.debug("Model response successfully received.")
+        if cache_key is not None and not (isinstance(result, dict) and "error" in result):
+            self.cache.set(cache_key, result)
+        return result  # Return the result if no error is found
@@ -0,0 +1,183 @@
+# http_session.py
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# Status codes that are worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def parse_retry_after(headers):
+    """
+    Parses a `Retry-After` header given in seconds or as an HTTP date.
+
+    Args:
+        headers (Mapping): The response headers.
+
+    Returns:
+        float or None: The requested delay in seconds, or None if absent or invalid.
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, backoff_factor=1.0, max_backoff=60):
+    """
+    Returns a "full jitter" exponential backoff delay for the given attempt.
+
+    Args:
+        attempt (int): The zero-based attempt number.
+        backoff_factor (float, optional): Base delay in seconds. Defaults to 1.0.
+        max_backoff (float, optional): Upper bound in seconds. Defaults to 60.
+
+    Returns:
+        float: A random delay between 0 and min(max_backoff, backoff_factor * 2 ** attempt).
+    """
+    return random.uniform(0, min(max_backoff, backoff_factor * (2 ** attempt)))
+
+class HTTPTransport:
+    def __init__(self, pool_size=10, timeout=(10, 120), max_retries=3, backoff_factor=1.0, max_backoff=60,
+                 retry_statuses=RETRY_STATUSES):
+        """
+        Initializes a pooled HTTP transport shared by the API clients.
+
+        A single `requests.Session` keeps connections alive across calls, so repeated
+        requests to the same host reuse one TCP+TLS connection instead of paying a new
+        handshake each time. Failed requests are retried with jittered exponential
+        backoff, honoring the server's `Retry-After` header when present.
+
+        Args:
+            pool_size (int, optional): Maximum number of pooled connections per host. Defaults to 10.
+            timeout (float or tuple, optional): Default (connect, read) timeout in seconds.
+            max_retries (int, optional): Number of retries after the first attempt. Defaults to 3.
+            backoff_factor (float, optional): Base delay in seconds for exponential backoff. Defaults to 1.0.
+            max_backoff (float, optional): Upper bound in seconds for a single delay. Defaults to 60.
+            retry_statuses (tuple, optional): HTTP status codes that trigger a retry.
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = tuple(retry_statuses)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request through the pooled session, retrying transient failures.
+
+        Connection errors, timeouts and responses with a status in `retry_statuses` are
+        retried up to `max_retries` times. The last response is returned even if its
+        status is an error, so callers keep using `raise_for_status()` as before.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            **kwargs: Passed to `requests.Session.request` (params, headers, json, stream, ...).
+
+        Returns:
+            requests.Response: The final response.
+
+        Raises:
+            requests.RequestException: If the last attempt fails without a response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    metrics.count("http_errors_total", host=urlsplit(url).netloc, error=type(e).__name__)
+                    raise
+                metrics.count("http_retries_total", host=urlsplit(url).netloc, reason=type(e).__name__)
+                time.sleep(backoff_delay(attempt, self.backoff_factor, self.max_backoff))
+                continue
+
+            if response.status_code not in self.retry_statuses or attempt == self.max_retries:
+                if metrics.is_enabled():
+                    self._record(method, url, response, time.perf_counter() - start, kwargs.get("stream", False))
+                return response
+
+            metrics.count("http_retries_total", host=urlsplit(url).netloc, reason=str(response.status_code))
+            delay = parse_retry_after(response.headers)
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_factor, self.max_backoff)
+            response.close()
+            time.sleep(min(delay, self.max_backoff))
+
+    def _record(self, method, url, response, seconds, stream):
+        host = urlsplit(url).netloc
+        metrics.observe("http_request_seconds", seconds, host=host, method=method, status=response.status_code)
+        # A streamed body has not been read yet; fall back to the declared length
+        if stream:
+            size = int(response.headers.get("Content-Length", 0) or 0)
+        else:
+            size = len(response.content)
+        metrics.count("http_response_bytes_total", size, host=host)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+def get_transport():
+    """
+    Returns the process-wide transport shared by all API clients, creating it on first use.
+
+    Returns:
+        HTTPTransport: The shared transport.
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport()
+        return _default_transport
+
+def configure_transport(**kwargs):
+    """
+    Replaces the shared transport with one built from the given settings.
+
+    Clients created afterwards (without an explicit transport) will use it.
+
+    Args:
+        **kwargs: Passed to `HTTPTransport`.
+
+    Returns:
+        HTTPTransport: The new shared transport.
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is not None:
+            _default_transport.close()
+        _default_transport = HTTPTransport(**kwargs)
+        return _default_transport
@@ -3,9 +3,19 @@
 import ipywidgets as widgets
 from IPython.display import display, clear_output
 import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pandas as pd
 from dotenv import load_dotenv
+from prompt_builder import build_data_section
+from prompt_templates import LOD_ANALYSIS_TEMPLATE
+from prefetch import default_facet_value, warm_up
+from catalog_index import CatalogIndex
+from facet_selector import FacetSelector
+import metrics
 import logging
 
 # Configure logging
@@ -30,11 +40,39 @@ class EnergyCostOptimizationInterface:
         # Store API keys from the environment if available
         self.eia_api_key = os.getenv("EIA_API_KEY")
         self.chat_gpt_api_key = os.getenv("CHAT_GPT_API_KEY")
+        self.hf_api_key = os.getenv("HF_API_KEY")  # Optional; enables Hugging Face as a hedge/failover provider
 
         # Initialize placeholders for API and data
         self.api = None
+        self.async_api = None
         self.chat_gpt_api = None
+        self.analysis_api = None  # ChatGPTAPI, or a ProviderRouter over ChatGPT and Hugging Face
         self.data = None
+        self.data_fields = None  # The data fields requested for self.data; other columns are series labels
+        self.prompt_token_budget = 1500  # Maximum estimated tokens of the data section of the analysis prompt
+
+        # Network loads run off the widget callback thread. Each kind of load has a generation
+        # counter; bumping it marks older in-flight loads of that kind as stale
+        # One loader thread serializes loads, so a stale load can never interleave its widget updates
+        # with a newer one; it bails out at its next checkpoint instead
+        self.loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ui-loader")
+        self.generations = {"route": 0, "periods": 0}
+        self.generation_lock = threading.Lock()
+        self.pending_loads = {}
+        self.frequency_debounce = 0.3  # Seconds to wait for the frequency selection to settle
+        self.frequency_timer = None
+
+        # Right after the routes are listed, the metadata of every shown route is prefetched in the
+        # background within a time budget, so the first click is served from memory
+        self.route_limit = 2  # Number of routes shown as buttons
+        self.warm_up_scope = ("details", "facets", "periods")  # Empty to disable the warm-up
+        self.warm_up_budget = 10.0  # Seconds
+        self.warm_up_result = None  # The summary of the last warm-up, once it has finished
+
+        # Offline route catalog built with `python catalog_index.py build`; when present, facet values
+        # come from it instead of the API. Loaded in the background with the warm-up
+        self.catalog_path = "eia_catalog.json.gz"
+        self.catalog = None
 
         # Main route buttons
         self.route_buttons_header = widgets.HTML("<h3>Select a Data Route:</h3>")
@@ -42,8 +80,9 @@ class EnergyCostOptimizationInterface:
 
         # UI elements for route-specific options
         self.frequency_dropdown = widgets.Dropdown(description='Frequency:', options=[], disabled=True)
-        self.facet_dropdowns = {}  # Dynamic facets
+        self.facet_selectors = {}  # Dynamic searchable multi-select facet selectors
         self.data_field_checkboxes = {}  # Dynamic data fields
+        self.data_field_box = widgets.VBox()  # Container for the data field checkboxes
 
         # Date range widgets
         self.start_date_dropdown = None
@@ -61,8 +100,9 @@ class EnergyCostOptimizationInterface:
         if self.eia_api_key and self.chat_gpt_api_key:
             # Initialize APIs if keys are present
             self.initialize_apis()
-            self.fetch_routes()
+            routes = self.fetch_routes()
             self.display_interface()
+            self.start_warm_up(routes)
         else:
             # Display form for API key inputs
             self.display_api_key_form()
@@ -94,8 +134,9 @@ class EnergyCostOptimizationInterface:
                 with self.output:
                     clear_output(wait=True)
                 form.close()
-                self.fetch_routes()
+                routes = self.fetch_routes()
                 self.display_interface()
+                self.start_warm_up(routes)
 
         submit_button.on_click(on_submit)
 
@@ -103,10 +144,29 @@ class EnergyCostOptimizationInterface:
         # Import the API classes
         from eia_api import EIAAPI
         from chat_gpt_api import ChatGPTAPI
+        from llm_cache import LLMResponseCache
         
-        # Initialize the APIs with the provided keys
-        self.api = EIAAPI(api_key=self.eia_api_key)
-        self.chat_gpt_api = ChatGPTAPI(api_key=self.chat_gpt_api_key)
+        # Initialize the APIs with the provided keys; route metadata is cached on disk between runs
+        self.api = EIAAPI(api_key=self.eia_api_key, cache_dir=".eia_cache")
+        # Identical analysis requests are answered from the on-disk response cache
+        llm_cache = LLMResponseCache(".llm_cache")
+        self.chat_gpt_api = ChatGPTAPI(api_key=self.chat_gpt_api_key, cache=llm_cache)
+        self.analysis_api = self.chat_gpt_api
+
+        # With a Hugging Face key, slow or failing ChatGPT calls are hedged and failed over to Hugging Face
+        if self.hf_api_key:
+            from hf_api import HFAPI
+            from llm_router import ProviderRouter
+            hf_api = HFAPI(api_key=self.hf_api_key, cache=llm_cache)
+            self.analysis_api = ProviderRouter([("chatgpt", self.chat_gpt_api), ("huggingface", hf_api)])
+
+        # The asyncio client loads a route's facet options concurrently; it needs aiohttp
+        try:
+            from async_eia_api import AsyncEIAAPI
+            self.async_api = AsyncEIAAPI(api_key=self.eia_api_key, cache_dir=".eia_cache")
+            self.async_api.memo = self.api.memo  # Share memoized metadata between both clients
+        except ImportError:
+            self.async_api = None
 
     def display_interface(self):
         # Display main UI components and URL output below
@@ -117,8 +177,8 @@ class EnergyCostOptimizationInterface:
     def fetch_routes(self):
         routes = self.api.fetch_routes()
 
-        # Only use the first two routes to create buttons
-        routes = routes[:2]
+        # Only use the first `route_limit` routes to create buttons
+        routes = routes[:self.route_limit]
 
         route_buttons = []
         max_button_width = '350px'  # Set a fixed width that looks consistent
@@ -140,18 +200,74 @@ class EnergyCostOptimizationInterface:
         # Set the buttons in a VBox for a vertically aligned group with centered buttons
         self.route_buttons_container.children = route_buttons
         self.route_buttons_container.layout = widgets.Layout(justify_content='center', align_items='center')
+        return routes
+
+    def start_warm_up(self, routes):
+        # Load the offline catalog and prefetch the shown routes' metadata into the clients' shared memo
+        # without blocking the UI
+        def run():
+            if self.catalog_path:
+                self.catalog = CatalogIndex.load(self.catalog_path)
+            if not routes or not self.warm_up_scope:
+                return
+            try:
+                self.warm_up_result = warm_up(self.api, [route["id"] for route in routes],
+                                              scope=self.warm_up_scope, time_budget=self.warm_up_budget)
+            except Exception as e:
+                # A failed warm-up only means the first click loads over the network
+                logging.warning(f"Warm-up failed: {e}")
+
+        thread = threading.Thread(target=run, name="ui-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def next_generation(self, kind):
+        # Starts a new load of this kind; loads started earlier become stale
+        with self.generation_lock:
+            self.generations[kind] += 1
+            return self.generations[kind]
+
+    def is_stale(self, kind, generation):
+        return generation is not None and generation != self.generations[kind]
+
+    def submit_load(self, kind, function, *args):
+        # A load that has not started yet is dropped outright when a newer one of its kind replaces it
+        previous = self.pending_loads.get(kind)
+        if previous is not None:
+            previous.cancel()
+        future = self.loader.submit(self.run_load, function, *args)
+        self.pending_loads[kind] = future
+        return future
+
+    def run_load(self, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            # Background failures would otherwise vanish silently with the future
+            self.show_status(f"Loading failed: {e}")
+
+    def show_status(self, message):
+        # Output.append_stdout is safe to call from loader threads, unlike `with self.output:`
+        self.output.clear_output(wait=True)
+        self.output.append_stdout(message + "\n")
 
+    @metrics.timed("ui_callback_seconds", callback="on_route_selected")
     def on_route_selected(self, route):
-        with self.output:
-            clear_output(wait=True)
-            print(f"Loading selected route: {route['name']}\n\nPlease wait...")
+        self.show_status(f"Loading selected route: {route['name']}\n\nPlease wait...")
 
         self.selected_route = route  # Store selected route
 
         # Setup UI options based on the selected route
         self.setup_route_ui(route)
 
+    @metrics.timed("ui_callback_seconds", callback="setup_route_ui")
     def setup_route_ui(self, route):
+        # A newer selection makes any route or period load still in flight stale
+        generation = self.next_generation("route")
+        self.next_generation("periods")
+        if self.frequency_timer is not None:
+            self.frequency_timer.cancel()
+
         # Unobserve frequency dropdown to prevent triggering on reset
         try:
             self.frequency_dropdown.unobserve(self.on_frequency_change, names='value')
@@ -162,20 +278,35 @@ class EnergyCostOptimizationInterface:
         self.frequency_dropdown.options = []
         self.frequency_dropdown.value = None  # Explicitly set value to None
         self.frequency_dropdown.disabled = True
-        self.facet_dropdowns = {}
+        self.facet_selectors = {}
         self.data_field_checkboxes = {}
+        self.fetch_data_button.disabled = True
+        self.run_analysis_button.disabled = True
+
+        # The network calls run in the background so the widgets stay responsive
+        self.submit_load("route", self.load_route, route, generation)
 
+    @metrics.timed("ui_load_seconds", load="route")
+    def load_route(self, route, generation):
         # Fetch route details
         route_details = self.api.fetch_route_details(route["id"])
+        if self.is_stale("route", generation):
+            return
 
         if not route_details:
-            with self.output:
-                clear_output(wait=True)
-                print("Failed to fetch route details.")
+            self.show_status("Failed to fetch route details.")
             return
 
-        # Configure frequency options
+        # Widgets are built first and only attached while this load is still current, since a newer
+        # selection resets the shared state and must not see anything of this route
         frequencies = [freq["id"].capitalize() for freq in route_details.get("frequency", [])]
+        facets = route_details.get("facets", [])
+        # Facet selectors show a loading state until their options arrive
+        selectors = {facet["id"]: FacetSelector(description=f'{facet["description"]}:') for facet in facets}
+
+        if self.is_stale("route", generation):
+            return
+        # Configure frequency options
         if frequencies:
             self.frequency_dropdown.options = frequencies
             default_frequency = route_details.get("defaultFrequency", frequencies[0]).capitalize()
@@ -185,25 +316,106 @@ class EnergyCostOptimizationInterface:
         # Re-observe changes to frequency dropdown
         self.frequency_dropdown.observe(self.on_frequency_change, names='value')
 
-        # Configure facet dropdowns
-        facets = route_details.get("facets", [])
-        for facet in facets:
-            options = self.api.fetch_facet_options(route["id"], facet["id"])
-            if options:
-                dropdown = widgets.Dropdown(description=f'{facet["description"]}:', options=options, disabled=False)
-
-                # Set "all sectors (ALL)" as the default for the Sector dropdown
-                if facet["id"] == "sectorid":
-                    # Set the default to "ALL" if available
-                    for option in options:
-                        if option[1] == "ALL":  # Accessing the id part of the tuple
-                            dropdown.value = option[1]  # Set the dropdown to use the value ID part of the tuple
-                            break
-
-                self.facet_dropdowns[facet["id"]] = dropdown
-
-        # Configure data fields
-        data_fields = self.api.fetch_data_fields(route["id"])
+        if self.is_stale("route", generation):
+            return
+        self.facet_selectors = selectors
+        # Data field checkboxes are filled in once the field list arrives
+        self.data_field_box = widgets.VBox()
+
+        if self.is_stale("route", generation):
+            return
+        self.display_route_ui()
+
+        # Fetch every facet option list and the data field list, filling widgets as results arrive
+        self.load_route_metadata(route["id"], facets, generation)
+
+        # Drop facets that turned out to have no options
+        selectors = {facet_id: selector for facet_id, selector in selectors.items() if not selector.disabled}
+        if self.is_stale("route", generation):
+            return
+        self.facet_selectors = selectors
+
+        # Initial setup of date range
+        self.update_date_range(route, self.next_generation("periods"))
+        if self.is_stale("route", generation):
+            return
+
+        # Enable fetch data button
+        self.fetch_data_button.disabled = False
+        self.run_analysis_button.disabled = True  # Disable until data is fetched
+
+        if self.is_stale("route", generation):
+            return
+        self.display_route_ui()
+
+    @metrics.timed("ui_load_seconds", load="route_metadata")
+    def load_route_metadata(self, route_id, facets, generation=None):
+        # Fill each widget as soon as its own result arrives; results of a stale route are dropped
+        def facet_loaded(facet_id, options):
+            if not self.is_stale("route", generation):
+                self.on_facet_options_loaded(facet_id, options)
+
+        def data_fields_loaded(data_fields):
+            if not self.is_stale("route", generation):
+                self.on_data_fields_loaded(data_fields)
+
+        # Facet values in the offline catalog need no request
+        if self.catalog is not None:
+            remaining = []
+            for facet in facets:
+                options = self.catalog.facet_options(route_id, facet["id"])
+                if options:
+                    facet_loaded(facet["id"], options)
+                else:
+                    remaining.append(facet)
+            facets = remaining
+
+        if self.async_api is None:
+            for facet in facets:
+                if self.is_stale("route", generation):
+                    return
+                facet_loaded(facet["id"], self.api.fetch_facet_options(route_id, facet["id"]))
+            if not self.is_stale("route", generation):
+                data_fields_loaded(self.api.fetch_data_fields(route_id))
+            return
+
+        from async_eia_api import run_in_background_loop
+
+        async def load_all():
+            async def load_facet(facet_id):
+                facet_loaded(facet_id, await self.async_api.fetch_facet_options(route_id, facet_id))
+
+            async def load_data_fields():
+                data_fields_loaded(await self.async_api.fetch_data_fields(route_id))
+
+            await asyncio.gather(load_data_fields(), *(load_facet(facet["id"]) for facet in facets))
+
+        run_in_background_loop(load_all())
+
+    def on_facet_options_loaded(self, facet_id, options):
+        selector = self.facet_selectors.get(facet_id)
+        if selector is None or not options:
+            return
+        # The first option, or "all sectors (ALL)" for the Sector facet; the warm-up prefetches the same defaults
+        selector.set_options(options, value=[default_facet_value(facet_id, options)],
+                             search=self.catalog_search(self.selected_route["id"], facet_id))
+
+    def catalog_search(self, route_id, facet_id):
+        # Searches a facet's values in the offline catalog, or returns None to filter them in the kernel.
+        # Only facets whose options came from the catalog are searched there; others were loaded from the API
+        if self.catalog is None or not self.catalog.facet_options(route_id, facet_id):
+            return None
+
+        def search(query, limit):
+            results = self.catalog.search(query, kind="value", route_id=route_id, facet_id=facet_id, limit=limit)
+            return [(f"{result['name']} ({result['id']})", result["id"]) for result in results]
+        return search
+
+    def selected_facets(self):
+        # Facets with nothing selected are left out, which the API treats as every value
+        return {facet_id: selector.value for facet_id, selector in self.facet_selectors.items() if selector.value}
+
+    def on_data_fields_loaded(self, data_fields):
         if data_fields:
             self.data_field_checkboxes = {
                 field_id: widgets.Checkbox(
@@ -212,25 +424,19 @@ class EnergyCostOptimizationInterface:
                 )
                 for alias, field_id in data_fields
             }
+        self.data_field_box.children = list(self.data_field_checkboxes.values())
 
-        # Initial setup of date range
-        self.update_date_range(route)
-
-        # Enable fetch data button
-        self.fetch_data_button.disabled = False
-        self.run_analysis_button.disabled = True  # Disable until data is fetched
-
+    def display_route_ui(self):
         # Arrange UI elements
-        facet_elements = list(self.facet_dropdowns.values())
+        facet_elements = list(self.facet_selectors.values())
         date_elements = [self.start_date_dropdown, self.end_date_dropdown] if self.start_date_dropdown and self.end_date_dropdown else []
-        data_field_elements = list(self.data_field_checkboxes.values())
 
         # Grouping widgets vertically for better organization
         main_elements = [
             self.frequency_dropdown,
             *facet_elements,
             *date_elements,
-            widgets.VBox(data_field_elements),  # Display checkboxes in a single VBox for consistent vertical alignment
+            self.data_field_box,  # Display checkboxes in a single VBox for consistent vertical alignment
         ]
 
         button_container = widgets.HBox(
@@ -239,29 +445,53 @@ class EnergyCostOptimizationInterface:
         )
         main_elements.append(button_container)
 
-        # Display all items in a VBox for alignment
-        with self.output:
-            clear_output(wait=True)
-            vbox_layout = widgets.VBox(
-                main_elements,
-                layout=widgets.Layout(
-                    align_items="center",  # Center all elements
-                    margin="20px",
-                    width='100%'
-                )
+        # Display all items in a VBox for alignment; append_display_data also works from loader threads
+        vbox_layout = widgets.VBox(
+            main_elements,
+            layout=widgets.Layout(
+                align_items="center",  # Center all elements
+                margin="20px",
+                width='100%'
             )
-            display(vbox_layout)
+        )
+        self.output.clear_output(wait=True)
+        self.output.append_display_data(vbox_layout)
 
+    @metrics.timed("ui_callback_seconds", callback="on_frequency_change")
     def on_frequency_change(self, change):
-        # Update date range when frequency changes
-        self.update_date_range(self.selected_route)
-
-    def update_date_range(self, route):
+        # Update date range when frequency changes, once the selection has settled,
+        # so clicking through several frequencies loads the periods only once
+        if self.frequency_timer is not None:
+            self.frequency_timer.cancel()
+        self.frequency_timer = threading.Timer(self.frequency_debounce, self.reload_date_range)
+        self.frequency_timer.daemon = True
+        self.frequency_timer.start()
+
+    def reload_date_range(self):
+        generation = self.next_generation("periods")
+        # Show the date dropdowns as loading until the new periods arrive, and keep
+        # data from being fetched with the previous frequency's dates meanwhile
+        for dropdown in (self.start_date_dropdown, self.end_date_dropdown):
+            if dropdown is not None:
+                dropdown.disabled = True
+        self.fetch_data_button.disabled = True
+        self.submit_load("periods", self.update_date_range, self.selected_route, generation, True)
+
+    @metrics.timed("ui_load_seconds", load="periods")
+    def update_date_range(self, route, generation=None, redisplay=False):
+        try:
+            self.load_date_range(route, generation, redisplay)
+        finally:
+            # Whatever happened, the latest load hands the controls back
+            if not self.is_stale("periods", generation):
+                for dropdown in (self.start_date_dropdown, self.end_date_dropdown):
+                    if dropdown is not None:
+                        dropdown.disabled = False
+                self.fetch_data_button.disabled = False
+
+    def load_date_range(self, route, generation, redisplay):
         # Collect selected facets
-        facets = {}
-        for facet_id, dropdown in self.facet_dropdowns.items():
-            selected_value = dropdown.value
-            facets[facet_id] = selected_value
+        facets = self.selected_facets()
 
         frequency = self.frequency_dropdown.value
         if frequency is None:
@@ -270,6 +500,9 @@ class EnergyCostOptimizationInterface:
             return
 
         available_periods = self.fetch_available_periods(route["id"], frequency, facets)
+        if self.is_stale("periods", generation):
+            return
+        had_dropdowns = self.start_date_dropdown is not None
 
         if available_periods:
             default_end_date = available_periods[-1]
@@ -290,68 +523,21 @@ class EnergyCostOptimizationInterface:
             self.start_date_dropdown = None
             self.end_date_dropdown = None
 
-    def fetch_available_periods(self, route_id, frequency, facets):
-        url = f"{self.api.base_url}{route_id}/data/"
-        params = {
-            "api_key": self.api.api_key,
-            "frequency": frequency.lower(),
-            "offset": 0,
-            "length": 1  # Initial request to get total number of records
-        }
-
-        # Add facets to params
-        for facet_id, value in facets.items():
-            params[f"facets[{facet_id}][]"] = value
+        # Date dropdowns that appeared or disappeared are only shown after a redraw
+        if redisplay and had_dropdowns != (self.start_date_dropdown is not None):
+            self.display_route_ui()
 
-        # Add a minimal data field to get data back (choose an appropriate data field if necessary)
-        params["data[]"] = "price"
-
-        try:
-            # Commented out debug logging to clear the screen
-            # full_url = requests.Request('GET', url, params=params).prepare().url
-            # logging.debug(f"Full URL for fetching available periods: {full_url}")
-
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if "response" in data and "total" in data["response"]:
-                total_records = data["response"]["total"]
-                # Commented out debug logging
-                # logging.debug(f"Total records available: {total_records}")
-            else:
-                # Commented out error logging
-                # logging.error("Unexpected data structure in API response.")
-                return []
-
-            # Now fetch all periods using the total_records as length
-            params["length"] = total_records
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if "response" in data and "data" in data["response"]:
-                periods = [item["period"] for item in data["response"]["data"]]
-                unique_periods = sorted(set(periods))
-                return unique_periods
-            else:
-                # Commented out error logging
-                # logging.error("Unexpected data structure in API response.")
-                return []
-        except requests.RequestException as e:
-            # Commented out error logging
-            # logging.error(f"Error fetching periods for {route_id}: {e}")
-            return []
+    def fetch_available_periods(self, route_id, frequency, facets):
+        # Two single-row sorted probes for the first and last period; the range in between is generated locally
+        return self.api.fetch_available_periods(route_id, frequency.lower(), facets)
 
+    @metrics.timed("ui_callback_seconds", callback="fetch_data")
     def fetch_data(self, b):
         # Gather parameters from UI
         frequency = self.frequency_dropdown.value.lower()
 
         # Collect selected facets
-        facets = {}
-        for facet_id, dropdown in self.facet_dropdowns.items():
-            selected_value = dropdown.value
-            facets[facet_id] = selected_value
+        facets = self.selected_facets()
 
         # Collect selected data fields
         data_fields = [field_id for field_id, checkbox in self.data_field_checkboxes.items() if checkbox.value]
@@ -388,6 +574,7 @@ class EnergyCostOptimizationInterface:
             if not full_data.empty:
                 sorted_data = full_data.sort_values(by="period", ascending=False)
                 self.data = sorted_data
+                self.data_fields = data_fields
                 with self.output:
                     clear_output(wait=True)
                     print("Data fetched (limited to a maximum of 10 rows):")
@@ -409,20 +596,9 @@ class EnergyCostOptimizationInterface:
             with self.output:
                 print(f"Error fetching data for {self.selected_route['id']}: {e}")
 
-    def display_analysis_result(self, result_text):
-        # Clear previous analysis output before displaying the new one
-        with self.analysis_output:
-            clear_output(wait=True)
-            title_html = widgets.HTML(
-                value="<h4 style='text-align: center;'>AI Analysis Result:</h4>",  # Added inline CSS to center the title text
-                layout=widgets.Layout(
-                    margin='0 0 10px 0',  # Add margin to separate the title from the text area
-                )
-            )
-
-            # Adding custom styles using HTML and CSS for better control
-            text_area_html = widgets.HTML(
-                value=f"""
+    def analysis_result_html(self, result_text):
+        # Adding custom styles using HTML and CSS for better control
+        return f"""
                 <div style="
                     border: 2px solid black;  /* Border around the text area */
                     padding: 10px;  /* Padding for better readability */
@@ -439,47 +615,53 @@ class EnergyCostOptimizationInterface:
                     {result_text}
                 </div>
                 """
+
+    def display_analysis_result(self, result_text):
+        # Clear previous analysis output before displaying the new one
+        with self.analysis_output:
+            clear_output(wait=True)
+            title_html = widgets.HTML(
+                value="<h4 style='text-align: center;'>AI Analysis Result:</h4>",  # Added inline CSS to center the title text
+                layout=widgets.Layout(
+                    margin='0 0 10px 0',  # Add margin to separate the title from the text area
+                )
             )
 
+            text_area_html = widgets.HTML(value=self.analysis_result_html(result_text))
+
             # Display the title and the styled text HTML element
             display(title_html, text_area_html)
+        return text_area_html
 
+    @metrics.timed("ui_callback_seconds", callback="run_analysis")
     def run_analysis(self, b):
         with self.output:
             clear_output(wait=True)
             print("Starting analysis. This may take a few moments...")
 
-        # Generate prompt from the data
-        data_str = self.data.to_string()
-
-        prompt = f"""Analyze the following dataset to suggest ways for cost optimization in energy usage using the services by LŌD.
-        Don't complain about any lack of data, just use what you have. Try to use numbers from the dataset as much as you can, using examples when possible.
-        Make it as if it were a marketing pitch for LŌD's services.
-        Take into account the following data about LōD (there's no need to cite everything, just use what you think is relevant):
-
-        1. LŌD’s platform is designed for mission-critical environments where availability comes first. With built-in redundancy, failover mechanisms, and the ability to scale across multiple sites and devices, LōD ensures reliability and high availability for industries that demand consistent, uninterrupted operations.
-        2. LōD is evolving with AI at its core, leveraging the strengths of LLMs for real-time monitoring, anomaly detection, and predictive maintenance. This allows customers to proactively optimize operations and reduce downtime by making smarter, data-driven decisions.
-        3. Created by a team of experts with deep knowledge of energy markets and industrial operations, LōD is designed to meet the unique needs of industries that require precise energy management. This expertise allows LōD to offer tailored solutions for managing operations based on grid conditions, optimizing energy costs, and maintaining peak operational performance.
-        4. LōD provides 24/7 customer support with a dedicated team of experts ensuring smooth operations and minimal downtime. The platform’s rapid response to issues, combined with tailored onboarding and training, allows clients to integrate LōD seamlessly into their operations while receiving continuous guidance and troubleshooting assistance.
-        5. LŌD Integrates with major DCIM platforms to implement advanced temperature management strategies to maintain quality of service and decrease carbon emissions based on RAILS no-code programming language.
-        6. Mission-Critical datacenters rely on multiple energy sources to ensure availability and quality of service. LŌD optimizes orchestration of energy resources to maximize profits, minimize carbon emissions and improve economics for datacenters.
-        7. Participate in demand response programs and avoid peaks by designing your multi-layer energy strategy based on real-time data from over 20,000 grid nodes.
-        8. Trade energy and ancillaries in the Day-Ahead-Market and lock-in opportunities based on your unique advantages.
+        # Generate a compact, token-budgeted summary of the data instead of dumping every row
+        frequency = self.frequency_dropdown.value or "monthly"
+        data_str = build_data_section(self.data, token_budget=self.prompt_token_budget, frequency=frequency,
+                                      data_fields=self.data_fields)
 
-        {data_str}
-        """
-
-        # Fetch AI analysis result from ChatGPTAPI
-        result = self.chat_gpt_api.analyze_data(prompt)
-
-        with self.analysis_output:
-            clear_output(wait=True)
-            if "error" in result:
-                print(result["error"])
-            else:
-                # Extract the generated text before passing it to display_analysis_result
-                generated_text = result["generated_text"]
-                self.display_analysis_result(generated_text)
+        # Stream the AI analysis from ChatGPTAPI, appending text to the result box as it arrives
+        text_area_html = self.display_analysis_result("")
+        generated_text = ""
+        last_update = 0.0
+        try:
+            # The fixed LŌD brief is a byte-stable template prefix the provider can cache; only the data varies
+            for delta in self.analysis_api.stream_data(data_str, template=LOD_ANALYSIS_TEMPLATE):
+                generated_text += delta
+                # Redraw at most every 0.1s so a fast stream does not flood the frontend with updates
+                if time.monotonic() - last_update >= 0.1:
+                    text_area_html.value = self.analysis_result_html(generated_text)
+                    last_update = time.monotonic()
+        except requests.RequestException as e:
+            with self.analysis_output:
+                clear_output(wait=True)
+                print(f"Analysis request failed: {e}")
+        else:
+            text_area_html.value = self.analysis_result_html(generated_text)
 
         # Also explicitly display the analysis output in case it wasn't auto-updated
         display(self.analysis_output)
\ No newline at end of file
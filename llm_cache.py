@@ -0,0 +1,133 @@
+# llm_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+class LLMResponseCache:
+    def __init__(self, cache_dir, ttl=7 * 24 * 3600, max_bytes=50 * 1024 * 1024):
+        """
+        Initializes a persistent, content-addressed cache of LLM responses.
+
+        Responses are stored as JSON files named after a hash of everything that determines
+        the answer (model, messages, temperature and prompt template version), so an
+        identical request is answered from disk instead of the provider.
+
+        Args:
+            cache_dir (str): Directory where responses are stored.
+            ttl (float, optional): Seconds a response stays valid. Defaults to 7 days.
+            max_bytes (int, optional): Total size above which the least recently used
+                responses are evicted. Defaults to 50 MB.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, messages, temperature=None, template_version=None):
+        """
+        Hashes the parts of a request that determine its response.
+
+        Args:
+            model (str): The model name or endpoint.
+            messages (list): The chat messages (or a single-prompt equivalent).
+            temperature (float, optional): The sampling temperature.
+            template_version (str, optional): The version of the prompt template.
+
+        Returns:
+            str: A hex SHA-256 digest.
+        """
+        payload = json.dumps({
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "template_version": template_version,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns a cached response if it exists and has not expired.
+
+        Args:
+            key (str): A key built by `make_key`.
+
+        Returns:
+            dict or None: The cached response, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) >= self.ttl:
+            self._remove(path)
+            return None
+        # Record the access so eviction drops the least recently used responses first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["response"]
+
+    def set(self, key, response):
+        """
+        Stores a response and evicts old entries if the cache grew past `max_bytes`.
+
+        Args:
+            key (str): A key built by `make_key`.
+            response (dict): The JSON-serializable response.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": time.time(), "response": response}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,326 @@
+# llm_router.py
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from map_reduce_analysis import result_text
+
+class LatencyTracker:
+    def __init__(self, window=100):
+        """
+        Keeps the latencies of a provider's most recent successful calls.
+
+        Args:
+            window (int, optional): The number of samples kept. Defaults to 100.
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        """
+        Returns a latency percentile over the window.
+
+        Args:
+            q (float): The percentile as a fraction (0.5 for p50, 0.95 for p95).
+
+        Returns:
+            float or None: The latency in seconds, or None if there are no samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+class _Provider:
+    def __init__(self, name, client, window):
+        self.name = name
+        self.client = client
+        self.latency = LatencyTracker(window)
+        self.first_chunk = LatencyTracker(window)  # Time to the first streamed chunk
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.hedges = 0
+        self.wins = 0
+        self.open_until = 0.0
+
+class ProviderRouter:
+    def __init__(self, providers, hedge_after=None, hedge_percentile=0.95, default_hedge_delay=20.0,
+                 min_hedge_delay=2.0, min_samples=5, failure_threshold=3, cooldown=60.0, window=100):
+        """
+        Initializes a router that sends analyses to several LLM providers.
+
+        Calls go to the first healthy provider. If it has not answered after the hedge
+        delay (its rolling p95 latency by default), a duplicate request goes to the next
+        provider and whichever answer arrives first wins; a provider that fails is
+        skipped immediately. After `failure_threshold` consecutive failures a provider is
+        taken out of rotation for `cooldown` seconds.
+
+        Args:
+            providers (list): (name, client) pairs in order of preference. Clients must have
+                `analyze_data(prompt)`; `ChatGPTAPI` and `HFAPI` both qualify.
+            hedge_after (float, optional): A fixed hedge delay in seconds. Defaults to None (adaptive).
+            hedge_percentile (float, optional): The latency percentile used as the adaptive hedge delay.
+                Defaults to 0.95.
+            default_hedge_delay (float, optional): The hedge delay before `min_samples` latencies are known.
+                Defaults to 20.0.
+            min_hedge_delay (float, optional): A lower bound for the adaptive hedge delay. Defaults to 2.0.
+            min_samples (int, optional): Samples needed before the adaptive delay is used. Defaults to 5.
+            failure_threshold (int, optional): Consecutive failures that take a provider out of rotation.
+                Defaults to 3.
+            cooldown (float, optional): Seconds a failing provider stays out of rotation. Defaults to 60.0.
+            window (int, optional): Latency samples kept per provider. Defaults to 100.
+        """
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = [_Provider(name, client, window) for name, client in providers]
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        # Losing hedged calls keep running until they return, so the pool allows one per provider per caller
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="llm-router")
+
+    def _available(self):
+        now = time.monotonic()
+        healthy = [provider for provider in self.providers if provider.open_until <= now]
+        # If every provider is failing, try them all rather than failing outright
+        return healthy or list(self.providers)
+
+    def _hedge_delay(self, provider, tracker=None):
+        if self.hedge_after is not None:
+            return self.hedge_after
+        tracker = tracker or provider.latency
+        if len(tracker) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, tracker.percentile(self.hedge_percentile))
+
+    def _record(self, provider, seconds, error):
+        with self._lock:
+            provider.requests += 1
+            if error is None:
+                provider.latency.record(seconds)
+                provider.consecutive_failures = 0
+                return
+            provider.failures += 1
+            provider.consecutive_failures += 1
+            if provider.consecutive_failures >= self.failure_threshold:
+                provider.open_until = time.monotonic() + self.cooldown
+
+    def _call(self, provider, prompt, template=None):
+        # Only pass a template when given, so clients without template support still work
+        kwargs = {} if template is None else {"template": template}
+        start = time.monotonic()
+        try:
+            text, error = result_text(provider.client.analyze_data(prompt, **kwargs))
+        except Exception as e:
+            # Any provider error, including a malformed answer, fails over like a request error
+            text, error = None, str(e) if isinstance(e, requests.RequestException) else f"{type(e).__name__}: {e}"
+        self._record(provider, time.monotonic() - start, error)
+        return provider, text, error
+
+    def analyze_data(self, prompt, template=None):
+        """
+        Analyzes a prompt with the fastest healthy provider.
+
+        Args:
+            prompt (str): The prompt to analyze.
+            template (PromptTemplate, optional): The fixed prefix to send before the prompt.
+
+        Returns:
+            dict: {"generated_text": str, "provider": str} on success, or {"error": str}
+            with the last error if every provider failed.
+        """
+        candidates = self._available()
+        pending = set()
+        last_error = "No provider answered"
+
+        while candidates or pending:
+            if candidates:
+                provider = candidates.pop(0)
+                pending.add(self._executor.submit(self._call, provider, prompt, template))
+                if len(pending) > 1:
+                    with self._lock:
+                        provider.hedges += 1
+                # Hedge with the next provider if nothing has answered within the delay
+                timeout = self._hedge_delay(provider) if candidates else None
+            else:
+                timeout = None
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, text, error = future.result()
+                if error is None:
+                    with self._lock:
+                        provider.wins += 1
+                    return {"generated_text": text, "provider": provider.name}
+                last_error = f"{provider.name}: {error}"
+
+        return {"error": last_error}
+
+    def _pump(self, provider, prompt, kwargs, events, cancelled):
+        # Runs one provider's stream on a worker thread, forwarding (provider, kind, value) events
+        start = time.monotonic()
+        started = False
+        try:
+            if hasattr(provider.client, "stream_data"):
+                stream = provider.client.stream_data(prompt, **kwargs)
+                try:
+                    for delta in stream:
+                        if cancelled.is_set():
+                            return
+                        if not started:
+                            started = True
+                            provider.first_chunk.record(time.monotonic() - start)
+                        events.put((provider, "delta", delta))
+                finally:
+                    # Closing the generator closes the losing provider's connection
+                    stream.close()
+            else:
+                text, error = result_text(provider.client.analyze_data(prompt, **kwargs))
+                if error is not None:
+                    raise requests.RequestException(error)
+                provider.first_chunk.record(time.monotonic() - start)
+                events.put((provider, "delta", text))
+        except Exception as e:
+            # Every failure must reach the queue, or stream_data would wait for this provider forever
+            if not isinstance(e, requests.RequestException):
+                error = requests.RequestException(f"{provider.name}: {type(e).__name__}: {e}")
+                error.__cause__ = e
+                e = error
+            if not cancelled.is_set():
+                self._record(provider, time.monotonic() - start, str(e))
+            events.put((provider, "error", e))
+            return
+        if not cancelled.is_set():
+            self._record(provider, time.monotonic() - start, None)
+        events.put((provider, "done", None))
+
+    def stream_data(self, prompt, template=None):
+        """
+        Streams an analysis from the fastest healthy provider.
+
+        The stream starts on the first healthy provider. If no chunk has arrived after the
+        hedge delay (its rolling p95 time to first chunk by default), a second stream
+        starts on the next provider; the first provider to yield a chunk wins and the
+        other streams are closed. A provider that fails before its first chunk is
+        replaced by the next one immediately. Providers without `stream_data` yield their
+        whole answer as one chunk.
+
+        Args:
+            prompt (str): The prompt to analyze.
+            template (PromptTemplate, optional): The fixed prefix to send before the prompt.
+
+        Yields:
+            str: Text deltas in order.
+
+        Raises:
+            requests.RequestException: If every provider fails before producing output, or
+            the winning stream fails after it started.
+        """
+        kwargs = {} if template is None else {"template": template}
+        candidates = self._available()
+        events = queue.Queue()
+        cancels = {}
+        in_flight = set()
+        winner = None
+        last_error = None
+
+        def launch():
+            provider = candidates.pop(0)
+            cancels[provider] = threading.Event()
+            if in_flight:
+                with self._lock:
+                    provider.hedges += 1
+            in_flight.add(provider)
+            self._executor.submit(self._pump, provider, prompt, kwargs, events, cancels[provider])
+            return provider
+
+        def choose(provider):
+            with self._lock:
+                provider.wins += 1
+            for other, cancelled in cancels.items():
+                if other is not provider:
+                    cancelled.set()
+            return provider
+
+        latest = launch()
+        try:
+            while in_flight:
+                # Hedge with the next provider if no stream has produced a chunk within the delay
+                timeout = None
+                if winner is None and candidates:
+                    timeout = self._hedge_delay(latest, latest.first_chunk)
+                try:
+                    provider, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    latest = launch()
+                    continue
+                if winner is not None and provider is not winner:
+                    continue
+
+                if kind == "delta":
+                    if winner is None:
+                        winner = choose(provider)
+                    yield value
+                    continue
+
+                in_flight.discard(provider)
+                if kind == "done":
+                    if winner is None:
+                        choose(provider)  # An empty answer still ends the analysis
+                    return
+                if winner is provider:
+                    raise value
+                last_error = value
+                if candidates and winner is None:
+                    latest = launch()
+        finally:
+            # Also reached when the caller stops reading early
+            for cancelled in cancels.values():
+                cancelled.set()
+        raise last_error or requests.RequestException("No provider answered")
+
+    def stats(self):
+        """
+        Returns per-provider counters and latency percentiles.
+
+        Returns:
+            dict: For each provider name, 'requests', 'failures', 'hedges', 'wins',
+            'p50', 'p95', 'first_chunk_p95' (seconds or None) and 'available'.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                provider.name: {
+                    "requests": provider.requests,
+                    "failures": provider.failures,
+                    "hedges": provider.hedges,
+                    "wins": provider.wins,
+                    "p50": provider.latency.percentile(0.5),
+                    "p95": provider.latency.percentile(0.95),
+                    "first_chunk_p95": provider.first_chunk.percentile(0.95),
+                    "available": provider.open_until <= now,
+                }
+                for provider in self.providers
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,263 @@
+# llm_scheduler.py
+
+import heapq
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from prompt_builder import estimate_tokens
+
+# Matches one component of a rate-limit reset duration such as "6m0s", "1.5s" or "20ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+def parse_duration(value):
+    """
+    Parses a rate-limit reset duration.
+
+    Args:
+        value (str): A duration such as "6m0s", "1.5s", "20ms" or a plain number of seconds.
+
+    Returns:
+        float or None: The duration in seconds, or None if it cannot be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+def parse_rate_limit_headers(headers):
+    """
+    Reads the provider's rate-limit state from response headers.
+
+    Understands the OpenAI `x-ratelimit-{limit,remaining,reset}-{requests,tokens}` headers.
+
+    Args:
+        headers (Mapping): The response headers.
+
+    Returns:
+        dict: For "requests" and "tokens", a dict with any of 'limit', 'remaining' and
+        'reset' (seconds) that were present.
+    """
+    state = {"requests": {}, "tokens": {}}
+    for kind in state:
+        for field in ("limit", "remaining"):
+            value = headers.get(f"x-ratelimit-{field}-{kind}")
+            if value is None:
+                continue
+            try:
+                state[kind][field] = float(value)
+            except ValueError:
+                pass
+        reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+        if reset is not None:
+            state[kind]["reset"] = reset
+    return state
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        """
+        A token bucket holding up to one minute of budget and refilling continuously.
+
+        Not thread-safe on its own; `LLMScheduler` guards its buckets with one lock.
+
+        Args:
+            per_minute (float): The sustained budget per minute (requests or tokens).
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount):
+        """
+        Returns how long to wait until `amount` can be taken.
+
+        Amounts larger than the capacity only wait for a full bucket, so oversized jobs
+        still run.
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+    def sync(self, limit=None, remaining=None, reset=None):
+        """
+        Aligns the bucket with the provider's view of the budget.
+
+        Args:
+            limit (float, optional): The provider's per-minute limit.
+            remaining (float, optional): The budget the provider reports as left.
+            reset (float, optional): Seconds until the provider's budget is fully replenished.
+        """
+        self._refill()
+        if limit:
+            self.capacity = limit
+        self.rate = self.capacity / 60.0
+        if remaining is not None:
+            # The provider's count lags requests still in flight, so never raise our own level
+            self.level = min(self.level, remaining)
+            if reset and remaining < self.capacity:
+                # Refill no faster than the provider does
+                self.rate = min(self.rate, (self.capacity - remaining) / reset)
+        self.level = min(self.level, self.capacity)
+
+class LLMScheduler:
+    def __init__(self, client, requests_per_minute=60, tokens_per_minute=40000, max_workers=4,
+                 completion_tokens=800):
+        """
+        Initializes a scheduler that dispatches analysis jobs at the highest rate the
+        provider sustains.
+
+        Every job needs one request and its estimated tokens (prompt plus
+        `completion_tokens`) from two token buckets. The buckets start from the given
+        budgets and are corrected from the provider's rate-limit response headers, so
+        jobs are held back before a limit is hit instead of sleeping after it. Queued
+        jobs are dispatched by priority, then in submission order.
+
+        Args:
+            client: A `ChatGPTAPI` or `HFAPI` instance. Its `rate_limit_listener` is set to this scheduler.
+            requests_per_minute (float, optional): The initial request budget. Defaults to 60.
+            tokens_per_minute (float, optional): The initial token budget. Defaults to 40000.
+            max_workers (int, optional): The maximum number of requests in flight. Defaults to 4.
+            completion_tokens (int, optional): Tokens reserved for each response. Defaults to 800.
+        """
+        self.client = client
+        self.completion_tokens = completion_tokens
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"llm-scheduler-{index}", daemon=True)
+            for index in range(max_workers)
+        ]
+        client.rate_limit_listener = self.observe_headers
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, prompt, priority=0, template=None):
+        """
+        Queues a prompt for analysis.
+
+        Args:
+            prompt (str): The prompt to pass to `client.analyze_data`.
+            priority (int, optional): Higher values are dispatched first. Defaults to 0.
+            template (PromptTemplate, optional): The fixed prefix to send before the prompt.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the result of `analyze_data`.
+        """
+        future = Future()
+        tokens = estimate_tokens(prompt) + self.completion_tokens
+        if template is not None:
+            tokens += estimate_tokens(template.prefix)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a scheduler that has been shut down")
+            heapq.heappush(self._queue, (-priority, next(self._sequence), tokens, prompt, template, future))
+            self._condition.notify()
+        return future
+
+    def map(self, prompts, priority=0):
+        """
+        Analyzes several prompts and returns their results in order.
+
+        Args:
+            prompts (iterable): The prompts to analyze.
+            priority (int, optional): The priority of every job. Defaults to 0.
+
+        Returns:
+            list: The results of `analyze_data`, one per prompt.
+        """
+        futures = [self.submit(prompt, priority) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def observe_headers(self, headers):
+        """
+        Updates the budgets from a response's rate-limit headers.
+
+        Args:
+            headers (Mapping): The response headers.
+        """
+        state = parse_rate_limit_headers(headers)
+        with self._condition:
+            self.request_bucket.sync(**state["requests"])
+            self.token_bucket.sync(**state["tokens"])
+            self._condition.notify_all()
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                if not self._queue:
+                    if self._closed:
+                        return None
+                    self._condition.wait()
+                    continue
+                # Wait for budget for the job at the head of the queue, so a higher-priority
+                # job submitted meanwhile is still dispatched first
+                tokens = self._queue[0][2]
+                delay = max(self.request_bucket.delay(1), self.token_bucket.delay(tokens))
+                if delay > 0:
+                    self._condition.wait(timeout=delay)
+                    continue
+                job = heapq.heappop(self._queue)
+                self.request_bucket.take(1)
+                self.token_bucket.take(tokens)
+                return job
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            _, _, _, prompt, template, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            # Only pass a template when given, so clients without template support still work
+            kwargs = {} if template is None else {"template": template}
+            try:
+                future.set_result(self.client.analyze_data(prompt, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True):
+        """
+        Stops accepting jobs; queued jobs are still processed.
+
+        Args:
+            wait (bool, optional): Whether to block until the queue is drained. Defaults to True.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        if self.client.rate_limit_listener == self.observe_headers:
+            self.client.rate_limit_listener = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
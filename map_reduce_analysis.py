@@ -0,0 +1,229 @@
+# map_reduce_analysis.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data_processing import generate_prompt
+from periods import parse_periods
+from prompt_builder import CHARS_PER_TOKEN, estimate_tokens
+
+REDUCE_INSTRUCTIONS = (
+    "Below are partial analyses of different slices of one energy dataset. "
+    "Combine them into a single coherent report: merge overlapping findings, compare the slices "
+    "with each other, highlight the most significant changes, peaks and patterns, and keep the "
+    "concrete numbers they cite."
+)
+
+def result_text(result):
+    """
+    Extracts the generated text from a `ChatGPTAPI` or `HFAPI` result.
+
+    Args:
+        result (dict or list): The value returned by `analyze_data`.
+
+    Returns:
+        tuple: (text, error). Exactly one of them is None.
+    """
+    if isinstance(result, list) and result:
+        result = result[0]
+    if not isinstance(result, dict):
+        return None, "Unexpected response from model"
+    if "error" in result:
+        return None, result["error"]
+    if "generated_text" in result:
+        return result["generated_text"], None
+    return None, "Unexpected response from model"
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=None):
+        """
+        Spaces out calls so that at most `requests_per_minute` start in any minute.
+
+        Args:
+            requests_per_minute (float, optional): The rate limit. Defaults to None (unlimited).
+        """
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Blocks until the next call is allowed to start.
+        """
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class MapReduceAnalyzer:
+    def __init__(self, client, reduce_client=None, max_parallel=4, requests_per_minute=None, chunk_token_budget=1500,
+                 scheduler=None, reduce_token_budget=6000):
+        """
+        Initializes a map-reduce analysis pipeline for datasets too large for one prompt.
+
+        The dataset is split by a facet column or a time window, every chunk is analyzed
+        concurrently, and a final reduce call combines the partial findings. If the
+        partials do not fit the reduce budget together, they are reduced in groups first
+        and the group results are reduced again, until one prompt holds them all.
+
+        Args:
+            client: A `ChatGPTAPI` or `HFAPI` instance used for the map calls.
+            reduce_client (optional): The client used for the reduce call. Defaults to `client`.
+            max_parallel (int, optional): The maximum number of map calls in flight. Defaults to 4.
+            requests_per_minute (float, optional): The maximum rate of LLM calls. Defaults to None (unlimited).
+            chunk_token_budget (int, optional): The token budget of each chunk's data section. Defaults to 1500.
+            scheduler (LLMScheduler, optional): Routes calls to the scheduler's client through it, so they
+                share its rate-limit budgets; the reduce call is queued ahead of other jobs. Defaults to None.
+            reduce_token_budget (int, optional): The maximum estimated tokens of a reduce prompt. Defaults to 6000.
+        """
+        self.client = client
+        self.reduce_client = reduce_client or client
+        self.max_parallel = max_parallel
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.chunk_token_budget = chunk_token_budget
+        self.scheduler = scheduler
+        self.reduce_token_budget = reduce_token_budget
+
+    def split(self, df, by=None, window=None, frequency="monthly"):
+        """
+        Splits a dataset into labelled chunks.
+
+        Args:
+            df (pandas.DataFrame): Rows returned by `EIAAPI.fetch_data`.
+            by (str, optional): A facet column to split on (e.g. 'stateid').
+            window (str, optional): A time window to split on: 'year' or 'quarter'.
+                Ignored when `by` is given.
+            frequency (str, optional): The frequency of the data, used to parse periods. Defaults to "monthly".
+
+        Returns:
+            list: (label, chunk) tuples in a stable order. The whole dataset is one chunk
+            if neither `by` nor `window` is given.
+        """
+        if by is not None:
+            return [(f"{by} = {key}", chunk) for key, chunk in df.groupby(by, sort=True, observed=True)]
+        if window is not None:
+            timestamps = parse_periods(df["period"], frequency)
+            if window == "year":
+                keys = timestamps.dt.year.astype(str)
+            elif window == "quarter":
+                keys = timestamps.dt.to_period("Q").astype(str)
+            else:
+                raise ValueError(f"Unsupported window '{window}'. Expected 'year' or 'quarter'.")
+            return [(f"period {key}", chunk) for key, chunk in df.groupby(keys.values, sort=True)]
+        return [("all data", df)]
+
+    def _call(self, client, prompt, priority=0):
+        if self.scheduler is not None and client is self.scheduler.client:
+            return result_text(self.scheduler.submit(prompt, priority).result())
+        self.rate_limiter.wait()
+        return result_text(client.analyze_data(prompt))
+
+    def analyze(self, df, date_range, by=None, window=None, frequency="monthly", data_fields=None):
+        """
+        Analyzes a dataset chunk by chunk and combines the findings.
+
+        Args:
+            df (pandas.DataFrame): Rows returned by `EIAAPI.fetch_data`.
+            date_range (str): A description of the covered dates for the prompts.
+            by (str, optional): A facet column to split on.
+            window (str, optional): A time window to split on ('year' or 'quarter').
+            frequency (str, optional): The frequency of the data. Defaults to "monthly".
+            data_fields (list, optional): The requested data field IDs, summarized as values. Defaults to None.
+
+        Returns:
+            dict: {"generated_text": str, "partials": list of (label, text)} on success, or
+            {"error": str} if every map call or the reduce call failed.
+        """
+        chunks = self.split(df, by=by, window=window, frequency=frequency)
+
+        def map_chunk(item):
+            label, chunk = item
+            prompt = generate_prompt(chunk, f"{date_range} ({label})", token_budget=self.chunk_token_budget,
+                                     frequency=frequency, data_fields=data_fields)
+            return label, self._call(self.client, prompt)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            mapped = list(executor.map(map_chunk, chunks))
+
+        partials = [(label, text) for label, (text, _) in mapped if text is not None]
+        if not partials:
+            errors = [error for _, (_, error) in mapped if error is not None]
+            return {"error": errors[0] if errors else "No data to analyze"}
+        if len(partials) == 1 and len(chunks) == 1:
+            return {"generated_text": partials[0][1], "partials": partials}
+
+        failed = [label for label, (text, _) in mapped if text is None]
+        text, error = self.reduce(partials, failed)
+        if error is not None:
+            return {"error": error}
+        return {"generated_text": text, "partials": partials}
+
+    @staticmethod
+    def _reduce_prompt(sections, failed=()):
+        prompt = REDUCE_INSTRUCTIONS + "\n\n" + "\n\n".join(f"### {label}\n{text}" for label, text in sections)
+        if failed:
+            prompt += "\n\n(No analysis is available for: " + ", ".join(failed) + ")"
+        return prompt
+
+    def _group(self, sections):
+        # Packs sections into groups whose reduce prompts fit the budget. Every section is first cut to
+        # half of the room left by the instructions, so any two fit together and each round shrinks the list
+        room = self.reduce_token_budget - estimate_tokens(REDUCE_INSTRUCTIONS)
+        max_chars = max(1, room // 2) * CHARS_PER_TOKEN
+        groups, current, used = [], [], 0
+        for label, text in sections:
+            section = f"### {label}\n{text}"
+            if len(section) > max_chars:
+                text = text[:max(0, max_chars - len(section) + len(text))]
+                section = f"### {label}\n{text}"
+            tokens = estimate_tokens(section)
+            if current and used + tokens > room:
+                groups.append(current)
+                current, used = [], 0
+            current.append((label, text))
+            used += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def reduce(self, partials, failed=()):
+        """
+        Combines partial analyses into one, hierarchically if they exceed the reduce budget.
+
+        Args:
+            partials (list): (label, text) tuples of the partial analyses.
+            failed (list, optional): Labels of slices without an analysis, noted in the final prompt.
+
+        Returns:
+            tuple: (text, error). Exactly one of them is None.
+        """
+        sections = list(partials)
+        while estimate_tokens(self._reduce_prompt(sections, failed)) > self.reduce_token_budget:
+            groups = self._group(sections)
+            if len(groups) == len(sections):
+                # Nothing left to merge; the cut sections are as small as they get
+                sections = [section for group in groups for section in group]
+                break
+
+            def reduce_group(group):
+                return self._call(self.reduce_client, self._reduce_prompt(group), priority=1)
+
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                results = list(executor.map(reduce_group, groups))
+            for _, error in results:
+                if error is not None:
+                    return None, error
+            sections = [
+                (", ".join(label for label, _ in group) if len(group) <= 3
+                 else f"{group[0][0]} ... {group[-1][0]} ({len(group)} slices)", text)
+                for group, (text, _) in zip(groups, results)
+            ]
+            if len(sections) == 1 and not failed:
+                # The last round already combined every partial
+                return sections[0][1], None
+        return self._call(self.reduce_client, self._reduce_prompt(sections, failed), priority=1)
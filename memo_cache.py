@@ -0,0 +1,132 @@
+# memo_cache.py
+
+import threading
+from collections import OrderedDict
+
+class _InFlight:
+    # A call in progress that other threads asking for the same key wait on
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlightCache:
+    def __init__(self, maxsize=256):
+        """
+        Initializes a thread-safe in-memory LRU cache with single-flight de-duplication.
+
+        When several threads ask for the same missing key at once, only the first one
+        runs the loader; the others wait for and share its result.
+
+        Args:
+            maxsize (int, optional): The maximum number of cached values. Defaults to 256.
+        """
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+
+    def get_or_call(self, key, loader, should_cache=bool):
+        """
+        Returns the cached value for a key, loading it at most once across threads.
+
+        Args:
+            key (hashable): The cache key.
+            loader (callable): A function without arguments that produces the value.
+            should_cache (callable, optional): Decides whether a loaded value is kept.
+                Defaults to `bool`, so failed lookups returning None or [] are retried next time.
+
+        Returns:
+            The cached or loaded value.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._values[key]
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                self._stats["misses"] += 1
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            in_flight.event.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.value
+
+        try:
+            value = loader()
+        except Exception as e:
+            in_flight.error = e
+            raise
+        else:
+            in_flight.value = value
+            if should_cache(value):
+                self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.event.set()
+
+    def get(self, key, default=None):
+        """
+        Returns a cached value without loading it, counting a hit or a miss.
+
+        Args:
+            key (hashable): The cache key.
+            default: The value returned when the key is not cached. Defaults to None.
+
+        Returns:
+            The cached value or `default`.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._values[key]
+            self._stats["misses"] += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries beyond `maxsize`.
+
+        Args:
+            key (hashable): The cache key.
+            value: The value to store.
+        """
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        """
+        Drops every cached value. Calls already in flight are not affected.
+        """
+        with self._lock:
+            self._values.clear()
+
+    def stats(self):
+        """
+        Returns hit/miss statistics.
+
+        Returns:
+            dict: Counts of 'hits', 'misses', 'shared' (callers that joined an in-flight load)
+            and 'evictions', plus the current 'size' and the 'hit_rate'.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._values)
+        lookups = stats["hits"] + stats["misses"] + stats["shared"]
+        stats["hit_rate"] = (stats["hits"] + stats["shared"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,192 @@
+# metadata_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Default time-to-live (in seconds) for each metadata endpoint.
+# EIA route metadata changes roughly once a month.
+DEFAULT_TTLS = {
+    "routes": 7 * 24 * 3600,
+    "route_details": 7 * 24 * 3600,
+    "facet_options": 24 * 3600,
+}
+
+class MetadataCache:
+    def __init__(self, cache_dir, ttls=None):
+        """
+        Initializes a persistent, file-based cache for EIA metadata responses.
+
+        Each entry is stored as a JSON file under `cache_dir`, named after a hash of
+        the normalized endpoint parameters, together with the validators
+        (ETag / Last-Modified) needed for conditional revalidation.
+
+        Args:
+            cache_dir (str): Directory where cache entries are stored.
+            ttls (dict, optional): Per-endpoint TTLs in seconds, merged over DEFAULT_TTLS.
+        """
+        self.cache_dir = cache_dir
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(endpoint, *parts):
+        """
+        Builds a normalized cache key for an endpoint and its parameters.
+
+        Route and facet IDs are lower-cased and stripped of surrounding slashes so that
+        'Retail-Sales/' and 'retail-sales' share one entry.
+
+        Args:
+            endpoint (str): The endpoint name (e.g., 'facet_options').
+            *parts (str): The route/facet identifiers of the request.
+
+        Returns:
+            str: The normalized key.
+        """
+        normalized = [str(part).strip().strip("/").lower() for part in parts if part is not None]
+        return "/".join([endpoint] + normalized)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key):
+        """
+        Returns the stored entry for a key, fresh or not.
+
+        Args:
+            key (str): A key built by `make_key`.
+
+        Returns:
+            dict or None: The entry with 'value', 'stored_at', 'etag' and 'last_modified',
+            or None if nothing is stored.
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """
+        Checks whether an entry is still within its endpoint's TTL.
+
+        Args:
+            entry (dict): An entry returned by `get`.
+
+        Returns:
+            bool: True if the entry can be served without revalidation.
+        """
+        ttl = self.ttls.get(entry.get("endpoint"), 0)
+        return time.time() - entry.get("stored_at", 0) < ttl
+
+    def set(self, key, endpoint, value, etag=None, last_modified=None):
+        """
+        Stores a value, replacing any previous entry atomically.
+
+        Args:
+            key (str): A key built by `make_key`.
+            endpoint (str): The endpoint name, used to look up the TTL.
+            value: The JSON-serializable value to store.
+            etag (str, optional): The ETag header of the response.
+            last_modified (str, optional): The Last-Modified header of the response.
+        """
+        entry = {
+            "key": key,
+            "endpoint": endpoint,
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "value": value,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def touch(self, entry):
+        """
+        Marks an entry as fresh again after a successful conditional revalidation.
+
+        Args:
+            entry (dict): An entry returned by `get`.
+        """
+        self.set(entry["key"], entry["endpoint"], entry["value"],
+                 etag=entry.get("etag"), last_modified=entry.get("last_modified"))
+
+    def conditional_headers(self, entry):
+        """
+        Builds the revalidation headers for a stale entry.
+
+        Args:
+            entry (dict or None): An entry returned by `get`.
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers, empty if there are no validators.
+        """
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def delete(self, key):
+        """
+        Removes a single cached entry.
+
+        Args:
+            key (str): A key built by `make_key`.
+
+        Returns:
+            bool: True if an entry was removed.
+        """
+        try:
+            os.remove(self._path(key))
+            return True
+        except OSError:
+            return False
+
+    def clear(self, prefix=None):
+        """
+        Removes cached entries.
+
+        Args:
+            prefix (str, optional): Only remove entries whose key starts with this prefix.
+                Defaults to None (remove everything).
+
+        Returns:
+            int: The number of entries removed.
+        """
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            if prefix is not None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        key = json.load(f).get("key", "")
+                except (OSError, ValueError):
+                    key = ""
+                if not key.startswith(prefix):
+                    continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
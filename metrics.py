@@ -0,0 +1,328 @@
+# metrics.py
+"""
+Low-overhead instrumentation for the API clients and the interface.
+
+Instrumented code calls `count`, `observe`, `timer` or `timed`. While no sink is
+enabled these return immediately, so instrumentation can stay in hot paths. Enable it
+at runtime with one or more sinks:
+
+    import metrics
+    memory = metrics.MemorySink()
+    metrics.enable(memory, metrics.JSONLinesSink("metrics.jsonl"),
+                   metrics.PrometheusTextSink("metrics.prom"))
+    ...
+    print(memory.format())
+    metrics.disable()
+
+Metric names follow Prometheus conventions: counters end in `_total` (or `_bytes_total`)
+and timings are histograms in seconds.
+"""
+
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_sinks = ()
+_sinks_lock = threading.Lock()
+
+def enable(*sinks):
+    """
+    Turns instrumentation on, replacing any previously enabled sinks.
+
+    Args:
+        *sinks: Sink objects with `record(kind, name, value, labels)` and `flush()`.
+            Defaults to a single `MemorySink`.
+
+    Returns:
+        tuple: The enabled sinks.
+    """
+    global _sinks
+    with _sinks_lock:
+        _sinks = tuple(sinks) or (MemorySink(),)
+        return _sinks
+
+def disable():
+    """
+    Turns instrumentation off after flushing the enabled sinks.
+    """
+    global _sinks
+    with _sinks_lock:
+        sinks, _sinks = _sinks, ()
+    for sink in sinks:
+        sink.flush()
+
+def is_enabled():
+    return bool(_sinks)
+
+def sinks():
+    return _sinks
+
+def flush():
+    for sink in _sinks:
+        sink.flush()
+
+def _emit(kind, name, value, labels):
+    for sink in _sinks:
+        sink.record(kind, name, value, labels)
+
+def count(name, value=1, **labels):
+    """
+    Adds to a counter.
+
+    Args:
+        name (str): The metric name (e.g. 'http_retries_total').
+        value (float, optional): The amount to add. Defaults to 1.
+        **labels: Label values identifying the series (e.g. host='api.eia.gov').
+    """
+    if _sinks:
+        _emit("counter", name, value, labels)
+
+def observe(name, value, **labels):
+    """
+    Records one observation of a histogram (a duration in seconds).
+
+    Args:
+        name (str): The metric name (e.g. 'http_request_seconds').
+        value (float): The observed value.
+        **labels: Label values identifying the series.
+    """
+    if _sinks:
+        _emit("histogram", name, value, labels)
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name, **labels):
+    """
+    Returns a context manager that records the duration of its block.
+
+    Args:
+        name (str): The histogram name.
+        **labels: Label values identifying the series.
+
+    Returns:
+        A context manager; a shared no-op one while instrumentation is off.
+    """
+    if not _sinks:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+def timed(name, **labels):
+    """
+    Decorates a function so every call records its duration.
+
+    Whether to measure is decided per call, so toggling instrumentation takes effect
+    immediately.
+
+    Args:
+        name (str): The histogram name.
+        **labels: Label values identifying the series.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return function(*args, **kwargs)
+            with _Timer(name, labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _series_name(name, labels):
+    if not labels:
+        return name
+    values = {key: str(value).replace("\\", "\\\\").replace('"', '\\"') for key, value in labels.items()}
+    return name + "{" + ",".join(f'{key}="{values[key]}"' for key in sorted(values)) + "}"
+
+class MemorySink:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Aggregates counters and histograms in memory.
+
+        Args:
+            buckets (tuple, optional): Histogram bucket upper bounds. Defaults to DEFAULT_BUCKETS.
+        """
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, value, labels):
+        key = (name, tuple(sorted((key, str(label)) for key, label in labels.items())))
+        with self._lock:
+            if kind == "counter":
+                self.counters[key] = self.counters.get(key, 0) + value
+                return
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"count": 0, "sum": 0.0, "min": value, "max": value,
+                                                    "buckets": [0] * len(self.buckets)}
+            histogram["count"] += 1
+            histogram["sum"] += value
+            histogram["min"] = min(histogram["min"], value)
+            histogram["max"] = max(histogram["max"], value)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+                    break
+
+    def flush(self):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """
+        Returns a copy of the aggregated metrics.
+
+        Returns:
+            dict: {"counters": {series: value}, "histograms": {series: {count, sum, min, max, mean}}},
+            where series is formatted like `name{label="value"}`.
+        """
+        with self._lock:
+            counters = {_series_name(name, dict(labels)): value for (name, labels), value in self.counters.items()}
+            histograms = {
+                _series_name(name, dict(labels)): {
+                    "count": h["count"], "sum": h["sum"], "min": h["min"], "max": h["max"],
+                    "mean": h["sum"] / h["count"],
+                }
+                for (name, labels), h in self.histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def format(self):
+        """
+        Renders the snapshot as a readable table, slowest total time first.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for series, h in sorted(snapshot["histograms"].items(), key=lambda item: -item[1]["sum"]):
+            lines.append(f"{series}: n={h['count']} total={h['sum']:.3f}s mean={h['mean'] * 1000:.1f}ms "
+                         f"max={h['max'] * 1000:.1f}ms")
+        for series, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{series}: {value:g}")
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, dict(h, buckets=list(h["buckets"]))) for key, h in self.histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{_series_name(name, dict(labels))} {value:g}")
+        for (name, labels), h in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            labels = dict(labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, h["buckets"]):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{_series_name(name + '_bucket', dict(labels, le=le))} {cumulative}")
+            lines.append(f"{_series_name(name + '_sum', labels)} {h['sum']:.6f}")
+            lines.append(f"{_series_name(name + '_count', labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+class PrometheusTextSink(MemorySink):
+    def __init__(self, path, interval=10.0, buckets=DEFAULT_BUCKETS):
+        """
+        Aggregates metrics in memory and rewrites a Prometheus text file with them.
+
+        The file is suitable for the node_exporter textfile collector. It is rewritten
+        atomically at most every `interval` seconds and on `flush()`.
+
+        Args:
+            path (str): The .prom file to write.
+            interval (float, optional): The minimum seconds between rewrites. Defaults to 10.0.
+            buckets (tuple, optional): Histogram bucket upper bounds. Defaults to DEFAULT_BUCKETS.
+        """
+        super().__init__(buckets)
+        self.path = path
+        self.interval = interval
+        self._last_write = 0.0
+
+    def record(self, kind, name, value, labels):
+        super().record(kind, name, value, labels)
+        if time.monotonic() - self._last_write >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self._last_write = time.monotonic()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+class JSONLinesSink:
+    def __init__(self, path):
+        """
+        Appends every metric event to a JSON lines file.
+
+        Each line is {"ts", "type", "name", "value", "labels"}. Lines are buffered and
+        written on `flush()` or when the buffer fills.
+
+        Args:
+            path (str): The file to append to.
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, value, labels):
+        line = json.dumps({"ts": time.time(), "type": kind, "name": name, "value": value, "labels": labels},
+                          default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,453 @@
+# mock_server.py
+"""
+Local stand-in for the EIA v2 electricity API and the OpenAI chat completions endpoint.
+
+Serves generated, deterministic data with the same facet, data-field, sort and
+offset/length pagination semantics as the real API, so the clients can be exercised and
+benchmarked without keys or network access. Latency and row counts are configurable.
+
+Usage:
+
+    with MockServer(facet_size=10, periods=120, eia_latency=0.05) as server:
+        api = EIAAPI(api_key="test")
+        api.base_url = server.eia_url
+        chat = ChatGPTAPI(api_key="test")
+        chat.base_url = server.openai_url
+
+Or standalone:
+
+    python mock_server.py [--port 8000] [--facet-size N] [--periods N] [--eia-latency S]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from periods import period_range, shift_period
+from prompt_templates import PROMPT_CACHE_INCREMENT, PROMPT_CACHE_MIN_TOKENS
+
+# The EIA API never returns more rows than this per request
+MAX_PAGE_LENGTH = 5000
+
+# Routes served by the mock: their facets, data fields (alias, units) and frequencies
+ROUTES = {
+    "retail-sales": {
+        "name": "Electricity Sales to Ultimate Customers",
+        "facets": ["stateid", "sectorid"],
+        "data": {
+            "price": ("Average Price of Electricity to Ultimate Customers", "cents per kilowatt-hour"),
+            "revenue": ("Revenue from Sales to Ultimate Customers", "million dollars"),
+            "sales": ("Megawatt-hours Sold", "million kilowatt hours"),
+            "customers": ("Number of Customers", "number of customers"),
+        },
+        "frequencies": ["monthly", "quarterly", "annual"],
+    },
+    "electric-power-operational-data": {
+        "name": "Electric Power Operations (Annual and Monthly)",
+        "facets": ["location", "sectorid", "fueltypeid"],
+        "data": {
+            "generation": ("Net Generation", "thousand megawatthours"),
+            "consumption-for-eg": ("Consumption of Fuels for Electricity Generation", "thousand physical units"),
+        },
+        "frequencies": ["monthly", "quarterly", "annual"],
+    },
+    "rto/region-data": {
+        "name": "Hourly Demand, Demand Forecast, Generation, and Interchange",
+        "facets": ["respondent", "type"],
+        "data": {"value": ("Value", "megawatthours")},
+        "frequencies": ["monthly", "annual"],
+    },
+    "facility-fuel": {
+        "name": "Facility level fuel consumption and generation",
+        "facets": ["state", "facilityid", "fuel2002", "primeMover"],
+        "data": {
+            "generation": ("Net Generation", "megawatthours"),
+            "total-consumption": ("Total Fuel Consumption", "MMBtu"),
+        },
+        "frequencies": ["monthly", "quarterly", "annual"],
+    },
+}
+
+# Routes that only list child routes, like electricity/rto in the real API
+ROUTE_GROUPS = {"rto": "Electric Power Operations (Daily and Hourly)"}
+
+# Facets with `large_facet_size` options, like plant codes and balancing authorities
+LARGE_FACETS = ("facilityid", "respondent")
+
+class MockServer:
+    def __init__(self, host="127.0.0.1", port=0, facet_size=10, periods=120, last_month="2024-12",
+                 large_facet_size=1000, eia_latency=0.0, llm_latency=0.0, llm_words=200,
+                 llm_words_per_second=200.0, requests_per_minute=500, tokens_per_minute=200000):
+        """
+        Initializes the mock server (call `start` or use it as a context manager).
+
+        Every route has `facet_size` options per facet and `periods` periods per
+        frequency ending at `last_month`, so a request for one series returns `periods`
+        rows and an unfiltered request returns facet_size ** n_facets * periods rows.
+
+        Args:
+            host (str, optional): The interface to bind. Defaults to "127.0.0.1".
+            port (int, optional): The port to bind; 0 picks a free one. Defaults to 0.
+            facet_size (int, optional): Options per facet. Defaults to 10.
+            large_facet_size (int, optional): Options per facet in LARGE_FACETS. Defaults to 1000.
+            periods (int, optional): Periods per series. Defaults to 120.
+            last_month (str, optional): The latest month of data ('YYYY-MM'). Defaults to "2024-12".
+            eia_latency (float, optional): Seconds added to every EIA response. Defaults to 0.0.
+            llm_latency (float, optional): Seconds before the first chat completion token. Defaults to 0.0.
+            llm_words (int, optional): Words in each chat completion. Defaults to 200.
+            llm_words_per_second (float, optional): Streaming speed of completions. Defaults to 200.0.
+            requests_per_minute (int, optional): The limit reported in rate-limit headers. Defaults to 500.
+            tokens_per_minute (int, optional): The token limit reported in rate-limit headers. Defaults to 200000.
+        """
+        self.host = host
+        self.port = port
+        self.facet_size = facet_size
+        self.large_facet_size = large_facet_size
+        self.periods = periods
+        self.last_month = last_month
+        self.eia_latency = eia_latency
+        self.llm_latency = llm_latency
+        self.llm_words = llm_words
+        self.llm_words_per_second = llm_words_per_second
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._periods = {}
+        self._seen_prefixes = set()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def eia_url(self):
+        return f"{self.base_url}/v2/electricity/"
+
+    @property
+    def openai_url(self):
+        return f"{self.base_url}/v1/chat/completions"
+
+    def start(self):
+        """
+        Starts serving on a background thread.
+
+        Returns:
+            str: The base URL of the server.
+        """
+        server = self
+
+        class Handler(_Handler):
+            mock = server
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def facet_options(self, facet_id):
+        """
+        Returns the (id, name) options of a facet.
+        """
+        size = self.large_facet_size if facet_id in LARGE_FACETS else self.facet_size
+        return [(f"{facet_id[:2].upper()}{index:02d}", f"{facet_id} option {index}") for index in range(size)]
+
+    def period_list(self, frequency):
+        """
+        Returns the ascending period strings served for a frequency.
+        """
+        if frequency not in self._periods:
+            last = {"monthly": self.last_month, "quarterly": self.last_month[:4] + "-Q4",
+                    "annual": self.last_month[:4]}[frequency]
+            first = shift_period(last, frequency, -(self.periods - 1))
+            self._periods[frequency] = period_range(first, last, frequency)
+        return self._periods[frequency]
+
+    def cached_tokens(self, messages):
+        """
+        Mimics OpenAI prompt caching: a system message seen before counts as cached input
+        if it has at least PROMPT_CACHE_MIN_TOKENS tokens, rounded down to whole
+        PROMPT_CACHE_INCREMENT blocks beyond the minimum.
+
+        Returns:
+            int: The number of cached prompt tokens.
+        """
+        system = "".join(str(message.get("content", "")) for message in messages if message.get("role") == "system")
+        tokens = len(system) // 4
+        if tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        with self._count_lock:
+            seen = system in self._seen_prefixes
+            self._seen_prefixes.add(system)
+        if not seen:
+            return 0
+        return PROMPT_CACHE_MIN_TOKENS + (tokens - PROMPT_CACHE_MIN_TOKENS) // PROMPT_CACHE_INCREMENT * PROMPT_CACHE_INCREMENT
+
+    def _count(self):
+        with self._count_lock:
+            self.request_count += 1
+
+def _child_routes(prefix):
+    """
+    Lists the routes and route groups directly below a path prefix ("" for the root).
+    """
+    children = {}
+    for route_id in ROUTES:
+        if not route_id.startswith(prefix):
+            continue
+        child = route_id[len(prefix):].split("/")[0]
+        if child not in children:
+            full_id = prefix + child
+            name = ROUTES[full_id]["name"] if full_id in ROUTES else ROUTE_GROUPS[full_id]
+            children[child] = {"id": child, "name": name, "description": name}
+    return list(children.values())
+
+class _Handler(BaseHTTPRequestHandler):
+    mock = None
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle's algorithm and
+        # delayed ACKs add ~40 ms to every keep-alive response
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_metadata(self, body):
+        # Metadata carries an ETag so conditional revalidation can be exercised
+        etag = '"' + hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(200, body, {"ETag": etag})
+
+    def do_GET(self):
+        mock = self.mock
+        mock._count()
+        if mock.eia_latency:
+            time.sleep(mock.eia_latency)
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        prefix = "/v2/electricity"
+        if not parsed.path.startswith(prefix):
+            return self._send_json(404, {"error": "Not found"})
+        parts = [part for part in parsed.path[len(prefix):].split("/") if part]
+
+        if not parts:
+            return self._send_metadata({"response": {"id": "electricity", "routes": _child_routes("")}})
+
+        # Nested route IDs contain "/", so the route is the longest one the path starts with
+        path = "/".join(parts)
+        route_id = max((candidate for candidate in ROUTES if path == candidate or path.startswith(candidate + "/")),
+                       key=len, default=None)
+        if route_id is None:
+            if path in ROUTE_GROUPS:
+                return self._send_metadata({"response": {"id": parts[-1], "name": ROUTE_GROUPS[path],
+                                                         "routes": _child_routes(path + "/")}})
+            return self._send_json(404, {"error": f"Route '{path}' not found"})
+        route = ROUTES[route_id]
+        parts = [route_id] + parts[len(route_id.split("/")):]
+
+        if len(parts) == 1:
+            return self._send_metadata({"response": {
+                "id": route_id.split("/")[-1],
+                "name": route["name"],
+                "frequency": [{"id": frequency, "description": frequency.capitalize()}
+                              for frequency in route["frequencies"]],
+                "facets": [{"id": facet_id, "description": facet_id} for facet_id in route["facets"]],
+                "data": {field: {"alias": alias, "units": units} for field, (alias, units) in route["data"].items()},
+            }})
+
+        if parts[1] == "facet" and len(parts) == 3 and parts[2] in route["facets"]:
+            options = mock.facet_options(parts[2])
+            return self._send_metadata({"response": {
+                "totalFacets": len(options),
+                "facets": [{"id": option_id, "name": name} for option_id, name in options],
+            }})
+
+        if parts[1] == "data":
+            return self._send_data(parts[0], route, query)
+
+        return self._send_json(404, {"error": "Not found"})
+
+    def _send_data(self, route_id, route, query):
+        mock = self.mock
+        frequency = query.get("frequency", ["monthly"])[0]
+        if frequency not in route["frequencies"]:
+            return self._send_json(400, {"error": f"Invalid frequency '{frequency}'"})
+
+        # Periods compare correctly as strings, including the 'YYYY-MM-DD' bounds EIAAPI sends
+        periods = mock.period_list(frequency)
+        positions = {period: position for position, period in enumerate(periods)}
+        start = query.get("start", [None])[0]
+        end = query.get("end", [None])[0]
+        periods = [period for period in periods if (not start or period >= start) and (not end or period <= end)]
+        if query.get("sort[0][column]", [None])[0] == "period" and query.get("sort[0][direction]", ["asc"])[0] == "desc":
+            periods = periods[::-1]
+
+        selected = []
+        for facet_id in route["facets"]:
+            options = mock.facet_options(facet_id)
+            values = query.get(f"facets[{facet_id}][]")
+            if values:
+                options = [option for option in options if option[0] in values]
+            selected.append(options)
+        series = list(itertools.product(*selected))
+        fields = [value for key, values in query.items() if key.startswith("data[") for value in values]
+        fields = [field for field in fields if field in route["data"]]
+
+        total = len(series) * len(periods)
+        offset = int(query.get("offset", [0])[0])
+        length = min(int(query.get("length", [MAX_PAGE_LENGTH])[0]), MAX_PAGE_LENGTH)
+
+        # Rows are ordered period-major, so row i is (periods[i // n_series], series[i % n_series])
+        rows = []
+        for index in range(offset, min(offset + length, total)):
+            period = periods[index // len(series)]
+            combination = series[index % len(series)]
+            row = {"period": period}
+            for facet_id, (option_id, name) in zip(route["facets"], combination):
+                row[facet_id] = option_id
+                row[f"{facet_id}Name"] = name
+            for field in fields:
+                seed = zlib.crc32(f"{route_id}|{field}|{'|'.join(option[0] for option in combination)}".encode("utf-8"))
+                # A per-series level plus a trend over the period's position, stable across filters and sorts
+                row[field] = str(round(10 + seed % 90 + (seed % 7) * 0.01 * positions[period], 2))
+                row[f"{field}-units"] = route["data"][field][1]
+            rows.append(row)
+
+        # The real API reports the total as a string
+        self._send_json(200, {"response": {"total": str(total), "dateFormat": "YYYY-MM", "frequency": frequency,
+                                           "data": rows}})
+
+    def do_POST(self):
+        mock = self.mock
+        mock._count()
+        if urlparse(self.path).path != "/v1/chat/completions":
+            return self._send_json(404, {"error": {"message": "Not found"}})
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+
+        prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+        prompt_tokens = max(1, len(prompt) // 4)
+        cached_tokens = mock.cached_tokens(request.get("messages", []))
+        words = [f"word{index}" for index in range(mock.llm_words)]
+        headers = {
+            "x-ratelimit-limit-requests": str(mock.requests_per_minute),
+            "x-ratelimit-remaining-requests": str(mock.requests_per_minute - 1),
+            "x-ratelimit-reset-requests": f"{60.0 / mock.requests_per_minute:.3f}s",
+            "x-ratelimit-limit-tokens": str(mock.tokens_per_minute),
+            "x-ratelimit-remaining-tokens": str(max(0, mock.tokens_per_minute - prompt_tokens - len(words))),
+            "x-ratelimit-reset-tokens": "1s",
+        }
+        if mock.llm_latency:
+            time.sleep(mock.llm_latency)
+
+        if not request.get("stream"):
+            if mock.llm_words_per_second:
+                time.sleep(len(words) / mock.llm_words_per_second)
+            return self._send_json(200, {
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words),
+                          "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+            }, headers)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for index, word in enumerate(words):
+                chunk = {"object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if mock.llm_words_per_second:
+                    time.sleep(1.0 / mock.llm_words_per_second)
+            if (request.get("stream_options") or {}).get("include_usage"):
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                         "total_tokens": prompt_tokens + len(words),
+                         "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+                chunk = {"object": "chat.completion.chunk", "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading the stream early
+            pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the EIA and OpenAI APIs.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on.")
+    parser.add_argument("--facet-size", type=int, default=10, help="Options per facet.")
+    parser.add_argument("--large-facet-size", type=int, default=1000, help="Options per plant/respondent facet.")
+    parser.add_argument("--periods", type=int, default=120, help="Periods per series.")
+    parser.add_argument("--eia-latency", type=float, default=0.0, help="Seconds added to every EIA response.")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds before the first completion token.")
+    args = parser.parse_args(argv)
+
+    server = MockServer(port=args.port, facet_size=args.facet_size, large_facet_size=args.large_facet_size,
+                        periods=args.periods, eia_latency=args.eia_latency, llm_latency=args.llm_latency)
+    server.start()
+    print(f"EIA API:    {server.eia_url}")
+    print(f"OpenAI API: {server.openai_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+# parquet_warehouse.py
+
+import os
+from urllib.parse import quote
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed when the warehouse is used
+    pa = None
+    pq = None
+
+class ParquetWarehouse:
+    def __init__(self, root_dir):
+        """
+        Initializes a local columnar warehouse for fetched EIA data.
+
+        Data is written as Parquet files partitioned by route, frequency and period year
+        (`route=<id>/frequency=<f>/year=<yyyy>/data.parquet`), so queries only open the
+        partitions and columns they need.
+
+        Args:
+            root_dir (str): Directory where partitions are stored.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        if pq is None:
+            raise ImportError("ParquetWarehouse requires pyarrow. Install it with 'pip install pyarrow'.")
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _partition_dir(self, route_id, frequency, year=None):
+        # Route IDs can contain slashes (e.g. 'rto/region-data'), so they are percent-encoded
+        path = os.path.join(self.root_dir, f"route={quote(route_id.strip('/'), safe='')}",
+                            f"frequency={frequency.lower()}")
+        if year is not None:
+            path = os.path.join(path, f"year={year}")
+        return path
+
+    def write(self, data, route_id, frequency, data_fields=None):
+        """
+        Writes fetched rows into their year partitions.
+
+        Rows are identified by their period and facet values. A new row is merged into
+        the stored row with the same identity: its non-empty values replace the stored
+        ones and other stored fields are kept. Writing the same data twice, or writing
+        different data fields of the same series, therefore never duplicates rows.
+
+        Args:
+            data (pandas.DataFrame): Rows returned by `EIAAPI.fetch_data`.
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            data_fields (list, optional): The data field IDs (value columns, not part of a row's identity).
+                Columns with a matching `<column>-units` column are treated as data fields too.
+
+        Returns:
+            int: The number of partitions written.
+        """
+        if data.empty or "period" not in data.columns:
+            return 0
+
+        data_fields = set(data_fields or [])
+        years = data["period"].astype(str).str[:4]
+        written = 0
+        for year, rows in data.groupby(years, sort=True):
+            partition_dir = self._partition_dir(route_id, frequency, year)
+            path = os.path.join(partition_dir, "data.parquet")
+            if os.path.exists(path):
+                rows = pd.concat([pq.read_table(path).to_pandas(), rows], ignore_index=True)
+
+            # Value columns of earlier writes may differ from this call's data fields; EIA rows carry a
+            # `<field>-units` column next to every data field, so those are recognized in either set of rows
+            columns = set(rows.columns)
+            identity = [column for column in rows.columns
+                        if column not in data_fields and not column.endswith("-units")
+                        and f"{column}-units" not in columns]
+            # The last non-empty value of every field wins, so fields written separately are combined
+            rows = rows.groupby(identity, sort=False, dropna=False, observed=True).last().reset_index()
+            rows = rows.sort_values(by="period", kind="stable").reset_index(drop=True)
+
+            os.makedirs(partition_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp_path)
+            os.replace(tmp_path, path)
+            written += 1
+        return written
+
+    def years(self, route_id, frequency):
+        """
+        Lists the year partitions stored for a route and frequency.
+
+        Returns:
+            list: The stored years as strings, in ascending order.
+        """
+        base = self._partition_dir(route_id, frequency)
+        if not os.path.isdir(base):
+            return []
+        return sorted(name[len("year="):] for name in os.listdir(base) if name.startswith("year="))
+
+    def query(self, route_id, frequency, start_year=None, end_year=None, columns=None, filters=None):
+        """
+        Reads stored rows, opening only the partitions and columns that are needed.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            start_year (int or str, optional): The first period year to read. Defaults to None.
+            end_year (int or str, optional): The last period year to read. Defaults to None.
+            columns (list, optional): The columns to read. Defaults to None (all columns).
+            filters (dict, optional): Column names mapped to a value or list of accepted values,
+                pushed down to the Parquet reader (e.g. {'stateid': ['CA', 'TX']}).
+
+        Returns:
+            pandas.DataFrame: The matching rows, empty if nothing is stored.
+        """
+        pyarrow_filters = None
+        if filters:
+            pyarrow_filters = [(column, "in", values if isinstance(values, list) else [values])
+                               for column, values in filters.items()]
+
+        frames = []
+        for year in self.years(route_id, frequency):
+            if start_year is not None and int(year) < int(start_year):
+                continue
+            if end_year is not None and int(year) > int(end_year):
+                continue
+            path = os.path.join(self._partition_dir(route_id, frequency, year), "data.parquet")
+            frames.append(pq.read_table(path, columns=columns, filters=pyarrow_filters, memory_map=True).to_pandas())
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
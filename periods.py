@@ -0,0 +1,123 @@
+# periods.py
+
+import pandas as pd
+
+# Calendar frequencies of EIA data and how their period strings are formatted
+PERIOD_FREQUENCIES = {
+    "annual": ("Y", "%Y"),
+    "quarterly": ("Q", "%Y-Q%q"),
+    "monthly": ("M", "%Y-%m"),
+}
+
+# Formats that pandas can parse directly with a vectorized strptime
+PARSE_FORMATS = {
+    "annual": "%Y",
+    "monthly": "%Y-%m",
+    "daily": "%Y-%m-%d",
+    "hourly": "%Y-%m-%dT%H",
+}
+
+# Sub-monthly frequencies, generated from timestamps
+TIMESTAMP_FREQUENCIES = {
+    "daily": (pd.Timedelta(days=1), "%Y-%m-%d"),
+    "hourly": (pd.Timedelta(hours=1), "%Y-%m-%dT%H"),
+}
+
+def period_range(first, last, frequency):
+    """
+    Generates every period string between two EIA periods, inclusive.
+
+    Args:
+        first (str): The earliest period (e.g., '2015-01').
+        last (str): The latest period (e.g., '2024-06').
+        frequency (str): The frequency of the data (e.g., 'monthly').
+
+    Returns:
+        list: The period strings in ascending order, formatted like the API formats them.
+        Frequencies without a regular calendar (e.g. 'local-hourly') return only the
+        distinct bounds.
+    """
+    frequency = frequency.lower()
+    try:
+        if frequency in PERIOD_FREQUENCIES:
+            freq, fmt = PERIOD_FREQUENCIES[frequency]
+            return pd.period_range(pd.Period(first, freq=freq), pd.Period(last, freq=freq), freq=freq).strftime(fmt).tolist()
+        if frequency in TIMESTAMP_FREQUENCIES:
+            step, fmt = TIMESTAMP_FREQUENCIES[frequency]
+            start = pd.to_datetime(first, format=fmt)
+            end = pd.to_datetime(last, format=fmt)
+            return pd.date_range(start, end, freq=step).strftime(fmt).tolist()
+    except ValueError:
+        pass
+    return sorted({first, last})
+
+def is_period(value, frequency):
+    """
+    Checks whether a string is a valid period for the given frequency.
+
+    Args:
+        value (str): The candidate period string.
+        frequency (str): The frequency of the data (e.g., 'quarterly').
+
+    Returns:
+        bool: True if the string can be parsed as a period of that frequency.
+    """
+    frequency = frequency.lower()
+    try:
+        if frequency in PERIOD_FREQUENCIES:
+            pd.Period(value, freq=PERIOD_FREQUENCIES[frequency][0])
+            return True
+        if frequency in TIMESTAMP_FREQUENCIES:
+            pd.to_datetime(value, format=TIMESTAMP_FREQUENCIES[frequency][1])
+            return True
+    except (TypeError, ValueError):
+        pass
+    return False
+
+def shift_period(value, frequency, n):
+    """
+    Moves a period string forward (positive n) or backward (negative n) by n periods.
+
+    Args:
+        value (str): The period string.
+        frequency (str): The frequency of the data (e.g., 'monthly').
+        n (int): The number of periods to shift by.
+
+    Returns:
+        str: The shifted period, or the original string for frequencies without a regular calendar.
+    """
+    frequency = frequency.lower()
+    try:
+        if frequency in PERIOD_FREQUENCIES:
+            freq, fmt = PERIOD_FREQUENCIES[frequency]
+            return (pd.Period(value, freq=freq) + n).strftime(fmt)
+        if frequency in TIMESTAMP_FREQUENCIES:
+            step, fmt = TIMESTAMP_FREQUENCIES[frequency]
+            return (pd.to_datetime(value, format=fmt) + n * step).strftime(fmt)
+    except ValueError:
+        pass
+    return value
+
+def parse_periods(values, frequency):
+    """
+    Parses a column of period strings into timestamps marking the start of each period.
+
+    Args:
+        values (pandas.Series): The period strings.
+        frequency (str): The frequency of the data (e.g., 'monthly').
+
+    Returns:
+        pandas.Series: A datetime64 series aligned with `values`. Local-hourly periods keep
+        their local wall-clock time (the UTC offset suffix is dropped). Values that cannot
+        be parsed become NaT.
+    """
+    frequency = frequency.lower()
+    values = values.astype(str)
+    if frequency == "quarterly":
+        parsed = pd.PeriodIndex(values.where(values.str.match(r"^\d{4}-?Q[1-4]$"), None), freq="Q")
+        return pd.Series(parsed.to_timestamp(), index=values.index)
+    if frequency == "local-hourly":
+        return pd.to_datetime(values.str[:13], format=PARSE_FORMATS["hourly"], errors="coerce")
+    if frequency in PARSE_FORMATS:
+        return pd.to_datetime(values, format=PARSE_FORMATS[frequency], errors="coerce")
+    return pd.to_datetime(values, errors="coerce")
@@ -0,0 +1,123 @@
+# prefetch.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import metrics
+
+WARM_UP_SCOPE = ("details", "facets", "periods")
+
+def default_facet_value(facet_id, options):
+    """
+    Returns the value a facet dropdown starts on.
+
+    Args:
+        facet_id (str): The ID of the facet.
+        options (list): (name, id) tuples as returned by `fetch_facet_options`.
+
+    Returns:
+        str or None: The first option's ID, or "ALL" for sectors when available; None without options.
+    """
+    if not options:
+        return None
+    # Sector dropdowns default to "all sectors (ALL)"
+    if facet_id == "sectorid":
+        for _, value in options:
+            if value == "ALL":
+                return value
+    return options[0][1]
+
+def default_frequency(route_details):
+    """
+    Returns the frequency a route is shown with first, lowercased as the API expects it.
+
+    Args:
+        route_details (dict): The route details as returned by `fetch_route_details`.
+
+    Returns:
+        str or None: The default frequency, or None if the route lists none.
+    """
+    frequencies = [freq["id"] for freq in route_details.get("frequency", [])]
+    if not frequencies:
+        return None
+    return route_details.get("defaultFrequency", frequencies[0]).lower()
+
+def warm_up(api, route_ids, scope=WARM_UP_SCOPE, time_budget=10.0, max_workers=8):
+    """
+    Loads the metadata of several routes concurrently so later lookups are served from memory.
+
+    Runs in up to three stages, each fanning out over a thread pool: the details of every
+    route, then the options of every facet, then the period bounds of each route at its
+    default frequency and default facet values (what the interface shows first). Results
+    land in the client's memo and metadata cache; nothing is returned but counts. Work
+    still queued when the time budget runs out is cancelled, and calls already running
+    finish in the background.
+
+    Args:
+        api (EIAAPI): The client whose caches to fill.
+        route_ids (list): The IDs of the routes to load.
+        scope (tuple, optional): Which of "details", "facets" and "periods" to load.
+            Facets and periods need details, which are loaded for them anyway.
+            Defaults to WARM_UP_SCOPE (all three).
+        time_budget (float, optional): Seconds to spend in total. Defaults to 10.0.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to 8.
+
+    Returns:
+        dict: 'completed' (False if the budget ran out), 'seconds', and the number of
+        'details', 'facets' and 'periods' loaded.
+    """
+    start = time.monotonic()
+    deadline = start + time_budget
+    summary = {"completed": True, "details": 0, "facets": 0, "periods": 0}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up")
+
+    def run_stage(calls):
+        # Returns the results that arrived in time, keyed like `calls`
+        futures = {key: executor.submit(function, *args) for key, (function, args) in calls.items()}
+        done, not_done = wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+        if not_done:
+            summary["completed"] = False
+        results = {}
+        for key, future in futures.items():
+            if future in done and future.exception() is None:
+                results[key] = future.result()
+        return results
+
+    try:
+        with metrics.timer("warm_up_seconds"):
+            if not set(scope) & set(WARM_UP_SCOPE):
+                return dict(summary, seconds=0.0)
+
+            details = run_stage({route_id: (api.fetch_route_details, (route_id,)) for route_id in route_ids})
+            details = {route_id: value for route_id, value in details.items() if value}
+            summary["details"] = len(details)
+
+            if summary["completed"] and ("facets" in scope or "periods" in scope):
+                options = run_stage({
+                    (route_id, facet["id"]): (api.fetch_facet_options, (route_id, facet["id"]))
+                    for route_id, route_details in details.items()
+                    for facet in route_details.get("facets", [])
+                })
+                summary["facets"] = sum(1 for values in options.values() if values)
+
+                if summary["completed"] and "periods" in scope:
+                    calls = {}
+                    for route_id, route_details in details.items():
+                        frequency = default_frequency(route_details)
+                        if frequency is None:
+                            continue
+                        # Facets without options get no dropdown, so they are left out of the query
+                        facets = {}
+                        for facet in route_details.get("facets", []):
+                            value = default_facet_value(facet["id"], options.get((route_id, facet["id"])))
+                            if value is not None:
+                                facets[facet["id"]] = value
+                        calls[route_id] = (api.fetch_period_bounds, (route_id, frequency, facets))
+                    bounds = run_stage(calls)
+                    summary["periods"] = sum(1 for value in bounds.values() if value)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    summary["seconds"] = time.monotonic() - start
+    metrics.count("warm_up_total", result="completed" if summary["completed"] else "timed_out")
+    return summary
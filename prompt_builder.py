@@ -0,0 +1,210 @@
+# prompt_builder.py
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Rough characters-per-token ratio for English text and numbers with GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Number of periods in a year, used for year-over-year deltas
+PERIODS_PER_YEAR = {
+    "annual": 1,
+    "quarterly": 4,
+    "monthly": 12,
+}
+
+# Absolute z-score above which a value is reported as an anomaly
+ANOMALY_Z_SCORE = 2.5
+
+def estimate_tokens(text):
+    """
+    Estimates how many tokens a text will use without loading a tokenizer.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+def detect_columns(df, data_fields=None):
+    """
+    Splits the columns of fetched EIA data into value columns and series label columns.
+
+    Numeric-looking facet codes (plant codes, respondent IDs) are labels, so values are
+    taken from the route's data fields when they are known. Otherwise columns with a
+    `<column>-units` companion are values, as the API sends one for every data field;
+    only data without units columns falls back to sniffing which columns parse as numbers.
+
+    Args:
+        df (pandas.DataFrame): Rows returned by `EIAAPI.fetch_data`.
+        data_fields (list, optional): The data field IDs that were requested. Defaults to None.
+
+    Returns:
+        tuple: (value_columns, label_columns). Label columns identify a series (facet IDs
+        and their descriptions).
+    """
+    columns = [column for column in df.columns if column != "period" and not column.endswith("-units")]
+    if data_fields is not None:
+        requested = set(data_fields)
+        value_columns = [column for column in columns if column in requested]
+    else:
+        value_columns = [column for column in columns if f"{column}-units" in df.columns]
+    if data_fields is None and not value_columns:
+        # A sample is enough to tell numbers from labels and avoids parsing every label string
+        sample = df.head(500)
+        for column in columns:
+            values = pd.to_numeric(sample[column], errors="coerce")
+            if values.notna().sum() > 0 and values.notna().mean() >= 0.9:
+                value_columns.append(column)
+    label_columns = [column for column in columns if column not in value_columns]
+    return value_columns, label_columns
+
+def summarize(df, value_columns=None, label_columns=None, frequency="monthly", data_fields=None):
+    """
+    Computes one row of summary statistics per (series, value column), vectorized.
+
+    Args:
+        df (pandas.DataFrame): Rows returned by `EIAAPI.fetch_data`.
+        value_columns (list, optional): Numeric columns to summarize. Detected if omitted.
+        label_columns (list, optional): Columns identifying a series. Detected if omitted.
+        frequency (str, optional): The frequency of the data, used for year-over-year deltas.
+            Defaults to "monthly".
+        data_fields (list, optional): The requested data field IDs, used to detect the columns.
+            Defaults to None.
+
+    Returns:
+        pandas.DataFrame: Columns 'series', 'field', 'units', 'n', 'first', 'last_period',
+        'min', 'max', 'mean', 'last', 'slope', 'yoy_pct', 'peak_period' and 'anomalies'.
+    """
+    if df.empty or "period" not in df.columns:
+        return pd.DataFrame()
+
+    detected_values, detected_labels = detect_columns(df, data_fields)
+    value_columns = value_columns if value_columns is not None else detected_values
+    label_columns = label_columns if label_columns is not None else detected_labels
+
+    data = df.sort_values("period", kind="stable").reset_index(drop=True)
+    series = pd.Series("all", index=data.index)
+    for position, column in enumerate(label_columns):
+        labels = data[column].astype(str)
+        series = labels if position == 0 else series + " / " + labels
+    lag = PERIODS_PER_YEAR.get(frequency.lower())
+
+    summaries = []
+    for field in value_columns:
+        frame = pd.DataFrame({
+            "series": series,
+            "period": data["period"].astype(str),
+            "y": pd.to_numeric(data[field], errors="coerce"),
+        }).dropna(subset=["y"])
+        if frame.empty:
+            continue
+
+        grouped = frame.groupby("series", sort=False)
+        frame["x"] = grouped.cumcount().astype(float)
+        frame["xy"] = frame["x"] * frame["y"]
+        frame["xx"] = frame["x"] * frame["x"]
+        mean = grouped["y"].transform("mean")
+        std = grouped["y"].transform("std")
+        frame["anomaly"] = (((frame["y"] - mean) / std.replace(0, np.nan)).abs() > ANOMALY_Z_SCORE).astype(int)
+        if lag:
+            previous = grouped["y"].shift(lag)
+            frame["yoy"] = (frame["y"] - previous) / previous.abs().replace(0, np.nan) * 100
+
+        grouped = frame.groupby("series", sort=False)
+        stats = grouped.agg(
+            n=("y", "size"),
+            first=("period", "first"),
+            last_period=("period", "last"),
+            min=("y", "min"),
+            max=("y", "max"),
+            mean=("y", "mean"),
+            last=("y", "last"),
+            mean_x=("x", "mean"),
+            mean_xy=("xy", "mean"),
+            mean_xx=("xx", "mean"),
+            anomalies=("anomaly", "sum"),
+        )
+        variance = stats["mean_xx"] - stats["mean_x"] ** 2
+        stats["slope"] = (stats["mean_xy"] - stats["mean_x"] * stats["mean"]) / variance.replace(0, np.nan)
+        stats["peak_period"] = frame.loc[grouped["y"].idxmax(), ["series", "period"]].set_index("series")["period"]
+        stats["yoy_pct"] = grouped["yoy"].last() if lag else np.nan
+
+        stats["field"] = field
+        units_column = f"{field}-units"
+        stats["units"] = str(data[units_column].iloc[0]) if units_column in data.columns else ""
+        summaries.append(stats.drop(columns=["mean_x", "mean_xy", "mean_xx"]).reset_index())
+
+    if not summaries:
+        return pd.DataFrame()
+    columns = ["series", "field", "units", "n", "first", "last_period", "min", "max", "mean", "last", "slope",
+               "yoy_pct", "peak_period", "anomalies"]
+    return pd.concat(summaries, ignore_index=True)[columns]
+
+def _format_number(value):
+    if pd.isna(value):
+        return "-"
+    return f"{value:.4g}"
+
+def format_summary_table(summary):
+    """
+    Renders summary rows as a compact pipe-separated table.
+
+    Args:
+        summary (pandas.DataFrame): The output of `summarize`.
+
+    Returns:
+        str: The table with a header line.
+    """
+    lines = ["series | field (units) | n | range | min | max | mean | last | slope/period | YoY % | peak | anomalies"]
+    for row in summary.itertuples(index=False):
+        field = f"{row.field} ({row.units})" if row.units else row.field
+        lines.append(" | ".join([
+            row.series, field, str(row.n), f"{row.first}..{row.last_period}",
+            _format_number(row.min), _format_number(row.max), _format_number(row.mean), _format_number(row.last),
+            _format_number(row.slope), _format_number(row.yoy_pct), row.peak_period, str(row.anomalies),
+        ]))
+    return "\n".join(lines)
+
+def build_data_section(df, token_budget=1500, frequency="monthly", data_fields=None):
+    """
+    Builds a compact description of a dataset that fits a token budget.
+
+    Rather than embedding every row, each series is reduced to summary statistics.
+    If the table is still over budget, the series with the smallest mean magnitude are
+    dropped first and the number of omitted rows is stated.
+
+    Args:
+        df (pandas.DataFrame): Rows returned by `EIAAPI.fetch_data`.
+        token_budget (int, optional): The maximum estimated tokens of the section. Defaults to 1500.
+        frequency (str, optional): The frequency of the data. Defaults to "monthly".
+        data_fields (list, optional): The requested data field IDs; every other column except
+            `period` and units is a series label. Defaults to None (detected).
+
+    Returns:
+        str: The data section of the prompt.
+    """
+    summary = summarize(df, frequency=frequency, data_fields=data_fields)
+    if summary.empty:
+        return "No numeric data is available."
+
+    summary = summary.reindex(summary["mean"].abs().sort_values(ascending=False).index)
+    header = f"Summary of {len(df)} rows ({summary['series'].nunique()} series) by series and field:\n"
+
+    # Binary search for the largest number of summary rows that fits the budget
+    low, high = 1, len(summary)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(header + format_summary_table(summary.head(middle))) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+
+    section = header + format_summary_table(summary.head(low))
+    if low < len(summary):
+        section += f"\n({len(summary) - low} smaller series/field rows omitted to fit the token budget)"
+    return section
@@ -0,0 +1,115 @@
+# prompt_templates.py
+
+import hashlib
+
+from prompt_builder import estimate_tokens
+
+# OpenAI only caches prompts of at least this many tokens, in increments of PROMPT_CACHE_INCREMENT beyond it
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT = 128
+
+class PromptTemplate:
+    def __init__(self, name, version, system, instructions=""):
+        """
+        A versioned prompt whose fixed text always comes first, byte for byte.
+
+        Providers cache the longest previously seen prefix of a request (OpenAI does so
+        automatically above 1024 tokens), which cuts time to first token and bills the
+        cached input tokens at a discount. That only works if the fixed text is identical
+        on every call and precedes anything that varies, so the system message holds the
+        whole fixed part and the per-call data goes last in the user message. Change the
+        text only together with `version`, which is also part of response cache keys.
+
+        A prefix shorter than PROMPT_CACHE_MIN_TOKENS is never cached on its own; see
+        `cacheable`. The provider can still cache it together with a long enough data part.
+
+        Args:
+            name (str): A short identifier of the template.
+            version (str): The template version.
+            system (str): The system message.
+            instructions (str, optional): Fixed task instructions appended to the system message.
+        """
+        self.name = name
+        self.version = version
+        self.prefix = system if not instructions else system + "\n\n" + instructions
+
+    @property
+    def key(self):
+        """
+        Returns 'name:version', used to tell cached responses of different templates apart.
+        """
+        return f"{self.name}:{self.version}"
+
+    @property
+    def prefix_hash(self):
+        """
+        Returns a short hash of the fixed prefix, to check it is byte-stable across releases.
+        """
+        return hashlib.sha256(self.prefix.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def cacheable(self):
+        """
+        Returns whether the prefix alone is long enough for OpenAI prompt caching.
+        """
+        return estimate_tokens(self.prefix) >= PROMPT_CACHE_MIN_TOKENS
+
+    def messages(self, variable):
+        """
+        Builds chat messages: the fixed prefix as the system message, then the variable part.
+
+        Args:
+            variable (str): The per-call text (e.g. the data section).
+
+        Returns:
+            list: The chat messages.
+        """
+        return [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": variable},
+        ]
+
+    def render(self, variable):
+        """
+        Builds a single prompt string for completion-style APIs, with the prefix first.
+
+        Args:
+            variable (str): The per-call text.
+
+        Returns:
+            str: The prompt.
+        """
+        return self.prefix + "\n\n" + variable
+
+# The original system message; prompts passed to the LLM clients without a template use it
+DEFAULT_TEMPLATE = PromptTemplate(
+    name="default",
+    version="1",
+    system="You are an AI that helps analyze datasets for cost optimization.",
+)
+
+LOD_INSTRUCTIONS = (
+    "Analyze the following dataset to suggest ways for cost optimization in energy usage using the services by LŌD.\n"
+    "Don't complain about any lack of data, just use what you have. Try to use numbers from the dataset as much as you can, using examples when possible.\n"
+    "Make it as if it were a marketing pitch for LŌD's services.\n"
+    "Take into account the following data about LōD (there's no need to cite everything, just use what you think is relevant):\n"
+    "\n"
+    "1. LŌD’s platform is designed for mission-critical environments where availability comes first. With built-in redundancy, failover mechanisms, and the ability to scale across multiple sites and devices, LōD ensures reliability and high availability for industries that demand consistent, uninterrupted operations.\n"
+    "2. LōD is evolving with AI at its core, leveraging the strengths of LLMs for real-time monitoring, anomaly detection, and predictive maintenance. This allows customers to proactively optimize operations and reduce downtime by making smarter, data-driven decisions.\n"
+    "3. Created by a team of experts with deep knowledge of energy markets and industrial operations, LōD is designed to meet the unique needs of industries that require precise energy management. This expertise allows LōD to offer tailored solutions for managing operations based on grid conditions, optimizing energy costs, and maintaining peak operational performance.\n"
+    "4. LōD provides 24/7 customer support with a dedicated team of experts ensuring smooth operations and minimal downtime. The platform’s rapid response to issues, combined with tailored onboarding and training, allows clients to integrate LōD seamlessly into their operations while receiving continuous guidance and troubleshooting assistance.\n"
+    "5. LŌD Integrates with major DCIM platforms to implement advanced temperature management strategies to maintain quality of service and decrease carbon emissions based on RAILS no-code programming language.\n"
+    "6. Mission-Critical datacenters rely on multiple energy sources to ensure availability and quality of service. LŌD optimizes orchestration of energy resources to maximize profits, minimize carbon emissions and improve economics for datacenters.\n"
+    "7. Participate in demand response programs and avoid peaks by designing your multi-layer energy strategy based on real-time data from over 20,000 grid nodes.\n"
+    "8. Trade energy and ancillaries in the Day-Ahead-Market and lock-in opportunities based on your unique advantages."
+)
+
+# The analysis run by the interface: the LŌD marketing brief, followed per call by the data summary.
+# At about 630 tokens the brief is below PROMPT_CACHE_MIN_TOKENS, so OpenAI does not cache it by itself;
+# it stays first and byte-stable so it is cached as soon as it grows past the minimum
+LOD_ANALYSIS_TEMPLATE = PromptTemplate(
+    name="lod-analysis",
+    version="1",
+    system="You are an AI that helps analyze datasets for cost optimization.",
+    instructions=LOD_INSTRUCTIONS,
+)
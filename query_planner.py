@@ -0,0 +1,219 @@
+# query_planner.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from eia_api import PAGE_SIZE
+from periods import PERIOD_FREQUENCIES, TIMESTAMP_FREQUENCIES, is_period, period_range
+
+class QuerySlice:
+    def __init__(self, route_id, frequency, facets, data_fields, start_date=None, end_date=None):
+        """
+        Describes one slice of data a caller wants, as it would be passed to `EIAAPI.fetch_data`.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs to include.
+            start_date (str, optional): The start date in 'YYYY-MM' format or a period string.
+            end_date (str, optional): The end date in 'YYYY-MM' format or a period string.
+        """
+        self.route_id = route_id
+        self.frequency = frequency
+        self.facets = {facet_id: [str(value) for value in (values if isinstance(values, list) else [values])]
+                       for facet_id, values in facets.items()}
+        self.data_fields = list(data_fields)
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def group_key(self):
+        # Slices can only share a request if everything but the facet values and fields matches
+        return (self.route_id, self.frequency, tuple(sorted(self.facets)), self.start_date, self.end_date)
+
+class QueryPlanner:
+    def __init__(self, api, row_cap=PAGE_SIZE, max_workers=4):
+        """
+        Initializes a planner that merges many small queries into few multi-value requests.
+
+        Args:
+            api (EIAAPI): The client used to dispatch the merged requests.
+            row_cap (int, optional): The maximum estimated rows per merged request, so each
+                request fits in one page. Defaults to PAGE_SIZE.
+            max_workers (int, optional): The maximum number of merged requests in flight. Defaults to 4.
+        """
+        self.api = api
+        self.row_cap = row_cap
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _period_bound(date, frequency, is_start):
+        """
+        Converts a start or end date into a period of the frequency.
+
+        A 'YYYY-MM' bound of daily or hourly data covers the whole month, so it becomes the
+        month's first or last period. Other dates are returned unchanged.
+        """
+        if frequency not in TIMESTAMP_FREQUENCIES or is_period(date, frequency):
+            return date
+        try:
+            month = pd.Period(date, freq="M")
+        except ValueError:
+            return date
+        step, fmt = TIMESTAMP_FREQUENCIES[frequency]
+        stamp = month.start_time if is_start else month.end_time.floor(step)
+        return stamp.strftime(fmt)
+
+    def _estimate_periods(self, frequency, start_date, end_date):
+        """
+        Estimates how many periods a date range covers.
+
+        Returns:
+            int or None: The number of periods, or None if the range is open-ended or the
+            frequency has no regular calendar.
+        """
+        frequency = frequency.lower()
+        if not start_date or not end_date:
+            return None
+        if frequency not in PERIOD_FREQUENCIES and frequency not in TIMESTAMP_FREQUENCIES:
+            return None
+        first = self._period_bound(start_date, frequency, is_start=True)
+        last = self._period_bound(end_date, frequency, is_start=False)
+        if not is_period(first, frequency) or not is_period(last, frequency):
+            return None
+        return max(1, len(period_range(first, last, frequency)))
+
+    def _fits(self, box, periods):
+        # Without an estimate the merged size is unbounded, so slices are left as they are
+        if periods is None:
+            return False
+        rows = periods
+        for values in box.values():
+            rows *= len(values)
+        return rows <= self.row_cap
+
+    def _merge_boxes(self, boxes, facet_ids, periods):
+        """
+        Merges facet value boxes that differ in a single facet.
+
+        Two requests that agree on every facet but one can be sent as one request whose
+        remaining facet lists the union of values, which returns exactly the rows of both.
+        Merging repeats across facets until nothing changes or the row cap is reached.
+        """
+        changed = True
+        while changed:
+            changed = False
+            for facet_id in facet_ids:
+                buckets = {}
+                for box in boxes:
+                    others = tuple(box[other] for other in facet_ids if other != facet_id)
+                    buckets.setdefault(others, []).append(box)
+
+                merged = []
+                for bucket in buckets.values():
+                    current = None
+                    for box in bucket:
+                        if current is None:
+                            current = dict(box)
+                            continue
+                        candidate = dict(current)
+                        candidate[facet_id] = current[facet_id] | box[facet_id]
+                        if self._fits(candidate, periods):
+                            current = candidate
+                        else:
+                            merged.append(current)
+                            current = dict(box)
+                    merged.append(current)
+
+                if len(merged) < len(boxes):
+                    changed = True
+                boxes = merged
+        return boxes
+
+    def plan(self, slices):
+        """
+        Merges slices into the smallest set of multi-value requests within the row cap.
+
+        Args:
+            slices (list): QuerySlice objects.
+
+        Returns:
+            list: Planned requests as dictionaries with 'route_id', 'frequency', 'facets'
+            (facet ID to list of values), 'data_fields', 'start_date', 'end_date' and
+            'slices' (indexes of the slices the request serves).
+        """
+        groups = {}
+        for index, query_slice in enumerate(slices):
+            groups.setdefault(query_slice.group_key(), []).append(index)
+
+        requests_planned = []
+        for (route_id, frequency, facet_ids, start_date, end_date), indexes in groups.items():
+            periods = self._estimate_periods(frequency, start_date, end_date)
+            boxes = []
+            for index in indexes:
+                box = {facet_id: frozenset(slices[index].facets[facet_id]) for facet_id in facet_ids}
+                if box not in boxes:
+                    boxes.append(box)
+            boxes = self._merge_boxes(boxes, list(facet_ids), periods)
+
+            for box in boxes:
+                served = [index for index in indexes
+                          if all(set(slices[index].facets[facet_id]) <= box[facet_id] for facet_id in facet_ids)]
+                data_fields = []
+                for index in served:
+                    for field in slices[index].data_fields:
+                        if field not in data_fields:
+                            data_fields.append(field)
+                requests_planned.append({
+                    "route_id": route_id,
+                    "frequency": frequency,
+                    "facets": {facet_id: sorted(box[facet_id]) for facet_id in facet_ids},
+                    "data_fields": data_fields,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "slices": served,
+                })
+        return requests_planned
+
+    def _split(self, data, query_slice, all_fields):
+        """
+        Extracts the rows and columns one slice asked for from a merged result.
+        """
+        if data.empty:
+            return pd.DataFrame()
+        mask = pd.Series(True, index=data.index)
+        for facet_id, values in query_slice.facets.items():
+            if facet_id in data.columns:
+                mask &= data[facet_id].astype(str).isin(values)
+
+        dropped = set(all_fields) - set(query_slice.data_fields)
+        columns = [column for column in data.columns
+                   if column not in dropped and not (column.endswith("-units") and column[:-len("-units")] in dropped)]
+        return data.loc[mask, columns].reset_index(drop=True)
+
+    def execute(self, slices):
+        """
+        Plans, dispatches and splits the results of a set of slices.
+
+        Args:
+            slices (list): QuerySlice objects.
+
+        Returns:
+            list: One DataFrame per slice, in the order the slices were given.
+        """
+        planned = self.plan(slices)
+
+        def dispatch(request):
+            return self.api.fetch_data(request["route_id"], request["frequency"], request["facets"],
+                                       request["data_fields"], start_date=request["start_date"],
+                                       end_date=request["end_date"], paginate=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(dispatch, planned))
+
+        frames = [pd.DataFrame() for _ in slices]
+        for request, data in zip(planned, results):
+            for index in request["slices"]:
+                frames[index] = self._split(data, slices[index], request["data_fields"])
+        return frames
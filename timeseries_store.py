@@ -0,0 +1,161 @@
+# timeseries_store.py
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+import requests
+
+from periods import shift_period
+
+class TimeSeriesStore:
+    def __init__(self, store_dir, lookback_periods=3):
+        """
+        Initializes a local store of EIA series that can be kept up to date incrementally.
+
+        Each series, identified by (route, frequency, facets, data fields), is kept in one
+        pickle file under `store_dir`. Syncing only requests the periods after the stored
+        high-water mark plus a look-back window, because EIA appends new periods and
+        occasionally revises recent ones.
+
+        Args:
+            store_dir (str): Directory where series are stored.
+            lookback_periods (int, optional): Number of periods before the high-water mark
+                to re-fetch on every sync to pick up revisions. Defaults to 3.
+        """
+        self.store_dir = store_dir
+        self.lookback_periods = lookback_periods
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(route_id, frequency, facets, data_fields):
+        """
+        Builds a normalized key identifying a stored series.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs.
+
+        Returns:
+            str: A JSON string that is identical for equivalent queries.
+        """
+        normalized_facets = {}
+        for facet_id, values in facets.items():
+            if not isinstance(values, list):
+                values = [values]
+            normalized_facets[facet_id] = sorted(str(value) for value in values)
+        return json.dumps({
+            "route": route_id.strip("/"),
+            "frequency": frequency.lower(),
+            "facets": normalized_facets,
+            "data": sorted(data_fields),
+        }, sort_keys=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.store_dir, f"{digest}.pkl")
+
+    def load(self, route_id, frequency, facets, data_fields):
+        """
+        Loads a stored series.
+
+        Args:
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs.
+
+        Returns:
+            pandas.DataFrame: The stored rows, empty if the series has never been synced.
+        """
+        path = self._path(self.make_key(route_id, frequency, facets, data_fields))
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_pickle(path)
+
+    def high_water_mark(self, data):
+        """
+        Returns the latest period present in stored rows.
+
+        Args:
+            data (pandas.DataFrame): Rows loaded with `load`.
+
+        Returns:
+            str or None: The latest period string, or None if there are no rows.
+        """
+        if data.empty or "period" not in data.columns:
+            return None
+        return data["period"].astype(str).max()
+
+    def merge(self, existing, fetched, data_fields):
+        """
+        Merges freshly fetched rows into stored rows.
+
+        Rows are identified by their period and facet columns; a fetched row replaces the
+        stored row with the same identity, so merging the same rows twice is a no-op.
+
+        Args:
+            existing (pandas.DataFrame): The stored rows.
+            fetched (pandas.DataFrame): The rows returned by the API.
+            data_fields (list): The data field IDs (value columns, not part of the identity).
+
+        Returns:
+            pandas.DataFrame: The merged rows sorted by period.
+        """
+        if existing.empty:
+            merged = fetched
+        elif fetched.empty:
+            merged = existing
+        else:
+            merged = pd.concat([existing, fetched], ignore_index=True)
+        if merged.empty:
+            return merged
+
+        identity = [column for column in merged.columns
+                    if column not in data_fields and not column.endswith("-units")]
+        merged = merged.drop_duplicates(subset=identity, keep="last")
+        return merged.sort_values(by="period", kind="stable").reset_index(drop=True)
+
+    def sync(self, api, route_id, frequency, facets, data_fields, start_date=None):
+        """
+        Brings a stored series up to date and returns it.
+
+        The first sync fetches everything from `start_date`. Later syncs only fetch from
+        the high-water mark minus `lookback_periods`. If a request fails, the stored rows
+        are left untouched and returned as they are.
+
+        Args:
+            api (EIAAPI): The client used to fetch data.
+            route_id (str): The ID of the route.
+            frequency (str): The frequency of the data (e.g., 'monthly').
+            facets (dict): A dictionary of facet IDs to their selected values (list or single value).
+            data_fields (list): A list of data field IDs to include in the response.
+            start_date (str, optional): The start of the history to keep, used on the first sync.
+
+        Returns:
+            pandas.DataFrame: The full stored series after the sync.
+        """
+        key = self.make_key(route_id, frequency, facets, data_fields)
+        existing = self.load(route_id, frequency, facets, data_fields)
+
+        high_water_mark = self.high_water_mark(existing)
+        if high_water_mark is not None:
+            start_date = shift_period(high_water_mark, frequency, -self.lookback_periods)
+
+        try:
+            chunks = list(api.iter_data(route_id, frequency, facets, data_fields, start_date=start_date))
+        except requests.RequestException as e:
+            # Commented out error logging
+            # logging.error(f"Error syncing data for route '{route_id}': {e}")
+            return existing
+        fetched = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+        merged = self.merge(existing, fetched, data_fields)
+        if not fetched.empty:
+            tmp_path = self._path(key) + ".tmp"
+            merged.to_pickle(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        return merged